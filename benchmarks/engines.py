@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Compares the execution engines of :class:`mania.node.VM` on the
+   Ackermann and factorial programs from test.py. With ``--slice`` the
+   processes are preempted every few ticks, both engines have to execute
+   the same number of instructions then.
+'''
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+import argparse
+import mania
+import mania.types as types
+import mania.node
+import mania.instructions
+from mania.scanner import Scanner
+from mania.parser import Parser
+from mania.compiler import SimpleCompiler
+from mania.node import Node
+from mania.frame import Scope
+import mania.builtins.mania as boot
+
+
+source = '''(define-module bench (ackermann factorial)
+    (define (a m n)
+        (if (== m 0)
+            (+ n 1)
+            (if (and (> m 0) (== n 0))
+                (a (- m 1) 1)
+                (a (- m 1) (a m (- n 1))))))
+
+    (define (f n)
+        (if (== n 0)
+            1
+            (* n (f (- n 1)))))
+
+    (define (ackermann)
+        (a 2 9))
+
+    (define (factorial)
+        (f 500)))'''
+
+
+def run(engine, entry, slice):
+    module = SimpleCompiler(types.Symbol('bench')).compile(
+        Parser(Scanner(source)).parse()
+    )
+
+    node = Node(2**32, 1, [])
+
+    node.spawn_process(
+        code=module.code(module.entry_point),
+        scope=Scope(parent=boot.Mania().scope)
+    )
+
+    node.start()
+
+    function = node.load_module(module.name).lookup(types.Symbol(entry))
+
+    process = mania.node.Process(
+        None,
+        node.next_pid,
+        function.code,
+        Scope(parent=function.scope),
+        engine
+    )
+
+    start = time.time()
+    executed = 0
+
+    while process.status == mania.node.RUNNING:
+        executed += slice - process.run(slice)
+
+    return time.time() - start, executed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--repeat', '-r',
+        type=int,
+        default=5
+    )
+
+    parser.add_argument('--slice', '-s',
+        type=int,
+        default=2**32
+    )
+
+    args = parser.parse_args(argv)
+
+    for entry in ('ackermann', 'factorial'):
+        counts = set()
+
+        for engine in (mania.node.TICK_ENGINE, mania.node.FAST_ENGINE):
+            timings = []
+
+            for _ in xrange(args.repeat):
+                elapsed, executed = run(engine, entry, args.slice)
+
+                timings.append(elapsed)
+                counts.add(executed)
+
+            print('{0:<10} {1:<5} best {2:.4f}s mean {3:.4f}s '
+                  '{4} instructions'.format(
+                entry,
+                engine,
+                min(timings),
+                sum(timings) / len(timings),
+                executed
+            ))
+
+        assert len(counts) == 1, 'engines executed {0}'.format(sorted(counts))
+
+    cache = mania.instructions.call_cache
+
+    print('call cache: {0} hits, {1} misses, {2} entries'.format(
+        cache.hits,
+        cache.misses,
+        len(cache)
+    ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Reports the memory used per instruction of a generated module, once
+   compiled, once loaded with :meth:`mania.types.Module.loads` and once
+   mapped with :class:`mania.types.LazyModule`. The function bodies are
+   also compiled one module each, the way ``define`` does.
+'''
+
+from __future__ import absolute_import, division, print_function
+import sys
+import argparse
+import mania.types as types
+import mania.instructions
+from mania.scanner import Scanner
+from mania.parser import Parser
+from mania.compiler import SimpleCompiler
+
+
+def generate(count):
+    return '\n'.join(
+        '(define (f{0} x) (print x) (+ x {0} {0}.5 "string {0}" (quote s{0})))'.format(i)
+        for i in xrange(count)
+    )
+
+
+def compile_functions(source):
+    modules = []
+
+    for form in Parser(Scanner(source)).parse():
+        compiler = SimpleCompiler(types.Nil())
+
+        compiler.compile_body(form.tail.tail, tail=True)
+        compiler.builder.add(mania.instructions.Return())
+
+        modules.append(compiler.builder.module)
+
+    return modules
+
+
+def measure(modules):
+    count = 0
+    size = 0
+
+    for module in modules:
+        count += len(module.instructions)
+        size += sys.getsizeof(module.instructions)
+
+        for column in (
+            module.instructions.opcodes,
+            module.instructions.arguments,
+            module.instructions.operands
+        ):
+            size += sys.getsizeof(column)
+
+    return count, size
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--functions', '-f',
+        type=int,
+        default=2000
+    )
+
+    args = parser.parse_args(argv)
+
+    source = generate(args.functions)
+    module = SimpleCompiler(types.Symbol('bench')).compile(
+        Parser(Scanner(source)).parse()
+    )
+
+    for name, modules in (
+        ('compiled', [module]),
+        ('loaded', [types.Module.loads(module.dumps())]),
+        ('mapped', [types.LazyModule(module.dumps())]),
+        ('functions', compile_functions(source))
+    ):
+        count, size = measure(modules)
+
+        print('{0:<9} {1} instructions, {2} bytes, '
+              '{3:.1f} bytes/instruction'.format(
+            name,
+            count,
+            size,
+            size / count
+        ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Compares the load throughput of :meth:`mania.types.Module.loads`
+   with the incremental :meth:`mania.types.Module.load_stream` on a
+   generated module, in both .bam formats.
+'''
+
+from __future__ import absolute_import, print_function
+import io
+import sys
+import time
+import argparse
+import mania.types as types
+import mania.consts as consts
+from mania.scanner import Scanner
+from mania.parser import Parser
+from mania.compiler import SimpleCompiler
+
+
+def generate(count):
+    return '\n'.join(
+        '(define (f{0} x) (+ x {0} {0}.5 "string {0}" (quote s{0})))'.format(i)
+        for i in xrange(count)
+    )
+
+
+def measure(load, data, repeat):
+    timings = []
+
+    for _ in xrange(repeat):
+        start = time.time()
+
+        load(data)
+
+        timings.append(time.time() - start)
+
+    return min(timings)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--functions', '-f',
+        type=int,
+        default=2000
+    )
+
+    parser.add_argument('--repeat', '-r',
+        type=int,
+        default=5
+    )
+
+    args = parser.parse_args(argv)
+
+    module = SimpleCompiler(types.Symbol('bench')).compile(
+        Parser(Scanner(generate(args.functions))).parse()
+    )
+
+    for version in (consts.FORMAT_V1, consts.FORMAT_V2):
+        data = module.dumps(version=version)
+
+        expected = types.Module.load_stream(io.BytesIO(data))
+        actual = types.Module.loads(data)
+
+        assert (
+            [types.dumps(constant) for constant in expected.constants] ==
+            [types.dumps(constant) for constant in actual.constants]
+        )
+        assert expected.entry_point == actual.entry_point
+        assert expected.instructions.opcodes == actual.instructions.opcodes
+        assert expected.instructions.arguments == actual.instructions.arguments
+        assert expected.instructions.operands == actual.instructions.operands
+
+        megabytes = len(data) / 1024.0 / 1024.0
+
+        print('v{0} module: {1} bytes, {2} constants, {3} instructions'.format(
+            version or 1,
+            len(data),
+            len(module.constants),
+            len(module.instructions)
+        ))
+
+        for name, load in (
+            ('stream', lambda data: types.Module.load_stream(io.BytesIO(data))),
+            ('bulk', types.Module.loads),
+            ('lazy', lambda data: types.LazyModule(data).instructions.opcodes)
+        ):
+            best = measure(load, data, args.repeat)
+
+            print('{0:<7} best {1:.4f}s {2:.2f} MB/s'.format(
+                name,
+                best,
+                megabytes / best
+            ))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Compares name resolution through the inline caches of
+   :func:`mania.instructions.lookup` with an uncached
+   :meth:`mania.frame.Frame.lookup` for plain and module qualified names.
+'''
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+import argparse
+import mania.types as types
+import mania.node
+import mania.instructions
+from mania.scanner import Scanner
+from mania.parser import Parser
+from mania.compiler import SimpleCompiler
+from mania.node import Node
+from mania.frame import Scope
+import mania.builtins.mania as boot
+
+
+source = '''(define-module bench (plain qualified)
+    (import 'mania:io)
+
+    (define (touch-plain n)
+        + - * == + - * == + - * == + - * == n)
+
+    (define (touch-qualified n)
+        mania:io:write mania:io:stdout mania:io:write mania:io:stdout
+        mania:io:write mania:io:stdout mania:io:write mania:io:stdout
+        mania:io:write mania:io:stdout mania:io:write mania:io:stdout
+        mania:io:write mania:io:stdout mania:io:write mania:io:stdout n)
+
+    (define (plain n)
+        (if (== n 0)
+            0
+            (plain (- (touch-plain n) 1))))
+
+    (define (qualified n)
+        (if (== n 0)
+            0
+            (qualified (- (touch-qualified n) 1)))))'''
+
+
+def load():
+    module = SimpleCompiler(types.Symbol('bench')).compile(
+        Parser(Scanner(source)).parse()
+    )
+
+    node = Node(2**32, 1, [])
+
+    node.spawn_process(
+        code=module.code(module.entry_point),
+        scope=Scope(parent=boot.Mania().scope)
+    )
+
+    node.start()
+
+    return node, node.load_module(module.name)
+
+
+def run(node, function, count):
+    process = mania.node.Process(
+        None,
+        node.next_pid,
+        function.code,
+        Scope(parent=function.scope)
+    )
+
+    process.vm.frame.push(types.Integer(count))
+
+    start = time.time()
+
+    process.run(2**32)
+
+    return time.time() - start
+
+
+def uncached(vm, name):
+    return vm.frame.lookup(name)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--count', '-c',
+        type=int,
+        default=2000
+    )
+
+    parser.add_argument('--repeat', '-r',
+        type=int,
+        default=3
+    )
+
+    args = parser.parse_args(argv)
+
+    node, module = load()
+    cached = mania.instructions.lookup
+
+    for entry in ('plain', 'qualified'):
+        function = module.lookup(types.Symbol(entry))
+
+        for name, lookup in (('cached', cached), ('uncached', uncached)):
+            mania.instructions.lookup = lookup
+
+            try:
+                best = min(
+                    run(node, function, args.count)
+                    for _ in xrange(args.repeat)
+                )
+
+            finally:
+                mania.instructions.lookup = cached
+
+            print('{0:<10} {1:<9} best {2:.4f}s'.format(entry, name, best))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Compares the decision tree used by :meth:`mania.types.Macro.expand`
+   with matching every rule in order, on the builtin macros and on a
+   macro with many literal keyed rules.
+'''
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+import argparse
+from mania.types import Symbol, Pair, Quoted, Ellipsis, Pattern, Rule, Macro
+from mania.types import MatchError
+from mania.scanner import Scanner
+from mania.parser import Parser
+import mania.builtins.mania as boot
+
+
+source = '''(define-module bench (main)
+    (define (a m n)
+        (if (== m 0)
+            (+ n 1)
+            (if (and (> m 0) (== n 0))
+                (a (- m 1) 1)
+                (a (- m 1) (a m (- n 1))))))
+
+    (define (loop n acc)
+        (let next ((i n) (acc acc))
+            (if (== i 0)
+                acc
+                (next (- i 1) (+ acc i)))))
+
+    (define x 42)
+
+    (define (main)
+        (lambda (y) (a x y))))'''
+
+
+keywords = ['case-{0}'.format(i) for i in xrange(16)]
+
+
+def keyed_macro():
+    rules = []
+
+    for keyword in keywords:
+        rules.append(Rule(Pattern(Pair.from_sequence([
+            Symbol('_'),
+            Quoted(Symbol(keyword)),
+            Symbol('value'),
+            Ellipsis()
+        ])), []))
+
+    return Macro(rules)
+
+
+def forms(expression, macros):
+    while isinstance(expression, Pair):
+        head = expression.head
+
+        if isinstance(head, Pair):
+            if isinstance(head.head, Symbol) and head.head in macros:
+                yield macros[head.head], head
+
+            for form in forms(head, macros):
+                yield form
+
+        expression = expression.tail
+
+
+def match_rules(macro):
+    def match(expression):
+        for rule in macro.rules:
+            try:
+                yield rule, rule.pattern.match(expression)
+
+            except MatchError:
+                pass
+
+    return match
+
+
+def measure(match, samples, repeat):
+    start = time.time()
+
+    for _ in xrange(repeat):
+        for macro, expression in samples:
+            for result in match(macro)(expression):
+                break
+
+    return time.time() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--repeat', '-r',
+        type=int,
+        default=2000
+    )
+
+    args = parser.parse_args(argv)
+
+    scope = boot.Mania().scope
+    macros = {}
+
+    for name in ('define', 'let', 'if', 'and', 'lambda'):
+        macros[Symbol(name)] = scope.lookup(Symbol(name))
+
+    builtin = list(forms(
+        Pair.from_sequence(list(Parser(Scanner(source)).parse())),
+        macros
+    ))
+
+    macro = keyed_macro()
+    keyed = [
+        (macro, Pair.from_sequence([
+            Symbol('select'), Symbol(keyword), Symbol('a'), Symbol('b')
+        ]))
+        for keyword in keywords
+    ]
+
+    for name, samples in (('builtin', builtin), ('keyed', keyed)):
+        for macro, expression in samples:
+            expected = [rule for rule, _ in match_rules(macro)(expression)]
+            actual = [rule for rule, _ in macro.match(expression)]
+
+            assert expected == actual, expression.to_string()
+
+        tree = measure(lambda macro: macro.match, samples, args.repeat)
+        rules = measure(match_rules, samples, args.repeat)
+
+        print('{0:<8} {1:>3} forms  tree {2:.4f}s  rules {3:.4f}s'.format(
+            name,
+            len(samples),
+            tree,
+            rules
+        ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
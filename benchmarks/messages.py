@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Ping-pong between two processes through ``mania:process``, reporting
+   messages per second.
+'''
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+import argparse
+import mania.types as types
+from mania.scanner import Scanner
+from mania.parser import Parser
+from mania.compiler import SimpleCompiler
+from mania.node import Node
+from mania.frame import Scope
+import mania.builtins.mania as boot
+
+
+source = '''(define-module bench (main)
+    (import 'mania:process)
+
+    (define (list e ...) e)
+
+    (define (pong)
+        (let loop ((message (mania:process:receive)))
+            (let ((from (head message))
+                  (n (head (tail message))))
+                (mania:process:! from n)
+                (if (== n 0)
+                    0
+                    (loop (mania:process:receive))))))
+
+    (define (main)
+        (let ((other (mania:process:spawn pong)))
+            (let loop ((n {0}))
+                (mania:process:! other (list (mania:process:self) n))
+                (let ((reply (mania:process:receive)))
+                    (if (== reply 0)
+                        0
+                        (loop (- reply 1))))))))'''
+
+
+def run(rounds, schedulers):
+    module = SimpleCompiler(types.Symbol('bench')).compile(
+        Parser(Scanner(source.format(rounds))).parse()
+    )
+
+    node = Node(1024, schedulers, [])
+
+    node.spawn_process(
+        code=module.code(module.entry_point),
+        scope=Scope(parent=boot.Mania().scope)
+    )
+
+    node.start()
+
+    function = node.load_module(module.name).lookup(types.Symbol('main'))
+
+    node.spawn_process(
+        code=function.code,
+        scope=Scope(parent=function.scope)
+    )
+
+    start = time.time()
+
+    node.start()
+
+    return time.time() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--rounds', '-r',
+        type=int,
+        default=2000
+    )
+
+    parser.add_argument('--schedulers', '-s',
+        type=int,
+        nargs='+',
+        default=[1, 2]
+    )
+
+    args = parser.parse_args(argv)
+
+    for schedulers in args.schedulers:
+        elapsed = run(args.rounds, schedulers)
+        messages = 2 * (args.rounds + 1)
+
+        print('{0} schedulers {1} messages in {2:.3f}s, {3:.0f} messages/s'.format(
+            schedulers,
+            messages,
+            elapsed,
+            messages / elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
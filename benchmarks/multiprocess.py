@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Runs N independent CPU-bound processes on the thread and the process
+   scheduler backends of :class:`mania.node.Node`.
+'''
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+import argparse
+import mania.types as types
+import mania.node
+from mania.scanner import Scanner
+from mania.parser import Parser
+from mania.compiler import SimpleCompiler
+from mania.frame import Scope
+import mania.builtins.mania as boot
+
+
+source = '''(let loop ((n {0}))
+    (if (== n 0)
+        0
+        (loop (- n 1))))'''
+
+
+def run(backend, schedulers, processes, iterations):
+    module = SimpleCompiler(types.Symbol('bench')).compile(
+        Parser(Scanner(source.format(iterations))).parse()
+    )
+
+    node = mania.node.Node(1024, schedulers, [], backend=backend)
+    library = boot.Mania()
+
+    for _ in xrange(processes):
+        node.spawn_process(
+            code=module.code(module.entry_point),
+            scope=Scope(parent=library.scope)
+        )
+
+    start = time.time()
+
+    node.start()
+
+    return time.time() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--processes', '-p',
+        type=int,
+        default=8
+    )
+
+    parser.add_argument('--iterations', '-i',
+        type=int,
+        default=5000
+    )
+
+    parser.add_argument('--schedulers', '-s',
+        type=int,
+        nargs='+',
+        default=[1, 2, 4]
+    )
+
+    args = parser.parse_args(argv)
+
+    for backend in (mania.node.THREAD_BACKEND, mania.node.PROCESS_BACKEND):
+        for schedulers in args.schedulers:
+            elapsed = run(backend, schedulers, args.processes, args.iterations)
+
+            print('{0:<7} {1:>2} schedulers {2:.3f}s'.format(
+                backend,
+                schedulers,
+                elapsed
+            ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Measures the cost of scheduling decisions in :class:`mania.node.Scheduler`
+   with a large number of mostly idle processes.
+'''
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+import argparse
+import mania.types as types
+import mania.instructions as instructions
+import mania.node
+from mania.frame import Scope
+
+
+def spin():
+    return types.Module(
+        types.Symbol('spin'),
+        0,
+        [types.Symbol('spin')],
+        types.Bytecode([instructions.Nop(), instructions.Jump(0)])
+    ).code(0)
+
+
+def step(scheduler):
+    with scheduler.condition:
+        process = scheduler.run_queue.pop()
+
+    scheduler.run_process(process)
+
+    with scheduler.condition:
+        scheduler.reschedule(process)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--processes', '-p',
+        type=int,
+        default=100000
+    )
+
+    parser.add_argument('--active', '-a',
+        type=int,
+        default=100
+    )
+
+    parser.add_argument('--slices', '-s',
+        type=int,
+        default=100000
+    )
+
+    parser.add_argument('--tick-limit', '-t',
+        type=int,
+        default=8
+    )
+
+    args = parser.parse_args(argv)
+
+    node = mania.node.Node(args.tick_limit, 1, [])
+    scheduler = mania.node.Scheduler(node, args.tick_limit)
+    code = spin()
+    processes = []
+
+    start = time.time()
+
+    for i in xrange(args.processes):
+        process = mania.node.Process(scheduler, i, code, Scope())
+
+        if i >= args.active:
+            process.status = mania.node.WAITING_FOR_MESSAGE
+
+        processes.append(scheduler.spawn_process(process))
+
+    spawned = time.time() - start
+
+    while len(scheduler.run_queue) > args.active:
+        step(scheduler)
+
+    start = time.time()
+
+    for _ in xrange(args.slices):
+        step(scheduler)
+
+    elapsed = time.time() - start
+
+    start = time.time()
+
+    for process in processes[args.active:]:
+        process.send(types.Nil())
+
+    woken = time.time() - start
+
+    print('spawn   {0} processes in {1:.3f}s'.format(args.processes, spawned))
+    print('run     {0} slices with {1} parked in {2:.3f}s, {3:.1f} us/slice'.format(
+        args.slices,
+        len(processes) - args.active,
+        elapsed,
+        elapsed / args.slices * 1e6
+    ))
+    print('wake    {0} processes in {1:.3f}s, {2:.1f} us/wakeup'.format(
+        len(processes) - args.active,
+        woken,
+        woken / max(len(processes) - args.active, 1) * 1e6
+    ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+   Spawns a large number of trivial processes on a
+   :class:`mania.node.Scheduler` and reports the memory used per process,
+   the spawn rate and the time needed to run them all to completion.
+'''
+
+from __future__ import absolute_import, print_function
+import sys
+import time
+import resource
+import argparse
+import mania.types as types
+import mania.instructions as instructions
+import mania.node
+from mania.frame import Scope
+
+
+def rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--processes', '-p',
+        type=int,
+        default=1000000
+    )
+
+    args = parser.parse_args(argv)
+
+    code = types.Module(
+        types.Symbol('trivial'),
+        0,
+        [types.Symbol('trivial')],
+        types.Bytecode([instructions.Exit()])
+    ).code(0)
+
+    node = mania.node.Node(16, 1, [])
+    scheduler = mania.node.Scheduler(node, 16)
+    scope = Scope()
+
+    before = rss()
+    start = time.time()
+
+    for i in xrange(args.processes):
+        scheduler.spawn_process(mania.node.Process(None, i, code, scope))
+
+    spawned = time.time() - start
+    after = rss()
+
+    node.process_count = args.processes
+
+    start = time.time()
+
+    while scheduler.run_queue:
+        process = scheduler.run_queue.pop()
+
+        scheduler.run_process(process)
+        scheduler.reschedule(process)
+
+    finished = time.time() - start
+
+    print('spawn   {0} processes in {1:.2f}s, {2:.0f} processes/s'.format(
+        args.processes,
+        spawned,
+        args.processes / spawned
+    ))
+    print('memory  {0:.0f} bytes/process'.format(
+        (after - before) / args.processes
+    ))
+    print('run     {0} processes to exit in {1:.2f}s'.format(
+        args.processes,
+        finished
+    ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -152,14 +152,14 @@ class Mania(types.NativeModule):
                 ])),
                 self.if_
             )
-        ]))
+        ], pure=True))
 
         self.register('and', NativeMacro([NativeRule(
             Pattern(Pair.from_sequence([
                 Symbol('_'), Symbol('left'), Symbol('right')
             ])),
             self.and_
-        )]))
+        )], pure=True))
 
         ignore = NativeMacro([NativeRule(
             Pattern(Pair.from_sequence([
@@ -168,6 +168,16 @@ class Mania(types.NativeModule):
             self.ignore
         )])
 
+        self.forms = {
+            self.lookup(Symbol('define')): 'define',
+            self.lookup(Symbol('define-values')): 'define-values',
+            self.lookup(Symbol('define-syntax')): 'define-syntax',
+            self.lookup(Symbol('lambda')): 'lambda',
+            self.lookup(Symbol('let')): 'let',
+            self.lookup(Symbol('if')): 'transparent',
+            self.lookup(Symbol('and')): 'transparent'
+        }
+
         self.register('comment', ignore)
         self.register('author', ignore)
         self.register('copyright', ignore)
@@ -215,10 +225,10 @@ class Mania(types.NativeModule):
     def tail(self, list):
         return list.tail
 
-    def ignore(self, vm, bindings):
+    def ignore(self, vm, bindings, tail=False):
         pass
 
-    def define_module(self, vm, bindings):
+    def define_module(self, vm, bindings, tail=False):
         name = bindings[Symbol('name')]
 
         if ':' in name.value and '' in name.value.split(':'):
@@ -243,7 +253,7 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def import_(self, vm, bindings):
+    def import_(self, vm, bindings, tail=False):
         compiler = mania.compiler.SimpleCompiler(types.Nil())
 
         compiler.compile_any(bindings[Symbol('name')])
@@ -266,13 +276,27 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def compile_function(self, bindings):
-        parameters = bindings[Symbol('parameters')] or []
-        body = bindings[Symbol('body')] or []
+    def resolver(self, vm, functions=None):
+        return mania.compiler.Resolver(vm.frame, self.forms, functions)
+
+    def compile_function(self, vm, bindings, name=None):
+        parameters = list(bindings[Symbol('parameters')] or [])
+        body = list(bindings[Symbol('body')] or [])
+        names = [p for p in parameters if not isinstance(p, Ellipsis)]
+
+        resolver = self.resolver(vm, [] if name is None else [name])
+
+        body = resolver.resolve_body(
+            body,
+            [resolver.level(names, body, [], slots=True)]
+        )
 
         compiler = mania.compiler.SimpleCompiler(types.Nil())
 
-        empty_check = None
+        if names:
+            compiler.builder.add(instructions.SetupLocals(
+                compiler.builder.constant(types.Layout(names))
+            ))
 
         for i, parameter in enumerate(parameters):
             if ':' in parameter.value and any(c != ':' for c in parameter.value):
@@ -282,41 +306,14 @@ class Mania(types.NativeModule):
                 if i + 2 < len(parameters):
                     raise mania.types.ExpandError()
 
-                empty_check = compiler.builder.add(None)
-
-                compiler.compile_any(types.Nil())
-
-                loop = compiler.builder.add(instructions.BuildPair())
-
-                end = compiler.builder.add(None)
-
-                compiler.builder.add(instructions.Jump(loop))
-
-                index = compiler.builder.index()
-
-                compiler.compile_any(types.Nil())
-
-            store = compiler.builder.add(instructions.Reverse())
-
-            compiler.builder.add(instructions.Store(
-                compiler.builder.constant(parameter)
-            ))
-
-            if empty_check is not None:
-                compiler.builder.replace(
-                    end,
-                    instructions.JumpIfSize(1, store)
-                )
-                compiler.builder.replace(
-                    empty_check,
-                    instructions.JumpIfEmpty(index)
-                )
+                compiler.builder.add(instructions.BuildRest())
+                compiler.builder.add(instructions.StoreLocal(i))
 
                 break
 
-        for node in body:
-            compiler.compile_any(node)
-            compiler.builder.add(instructions.Eval())
+            compiler.builder.add(instructions.StoreLocal(i))
+
+        compiler.compile_body(body, tail=True)
 
         compiler.builder.add(instructions.Return())
 
@@ -327,13 +324,13 @@ class Mania(types.NativeModule):
 
         return compiler
 
-    def define_function(self, vm, bindings):
+    def define_function(self, vm, bindings, tail=False):
         name = bindings[Symbol('name')]
 
         if ':' in name.value and any(c != ':' for c in name.value):
             raise mania.types.ExpandError()
 
-        compiler = self.compile_function(bindings)
+        compiler = self.compile_function(vm, bindings, name)
 
         compiler.builder.add(instructions.Duplicate(1))
         compiler.builder.add(instructions.Store(
@@ -347,7 +344,7 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def define_value(vm, bindings):
+    def define_value(self, vm, bindings, tail=False):
         name = bindings[Symbol('name')]
 
         if ':' in name.value and any(c != ':' for c in name.value):
@@ -369,7 +366,7 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def define_values(self, vm, bindings):
+    def define_values(self, vm, bindings, tail=False):
         compiler = mania.compiler.SimpleCompiler(types.Nil())
 
         compiler.compile_any(bindings[Symbol('body')])
@@ -392,8 +389,8 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def lambda_(self, vm, bindings):
-        compiler = self.compile_function(bindings)
+    def lambda_(self, vm, bindings, tail=False):
+        compiler = self.compile_function(vm, bindings)
 
         module = compiler.builder.module
 
@@ -402,7 +399,7 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def define_syntax(self, vm, bindings):
+    def define_syntax(self, vm, bindings, tail=False):
         rules = zip(bindings[Symbol('pattern')], bindings[Symbol('template')])
 
         compiler = mania.compiler.SimpleCompiler(types.Nil())
@@ -430,59 +427,75 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def let(self, vm, bindings):
+    def let(self, vm, bindings, tail=False):
         variables = list(bindings[Symbol('variables')] or [])
         values = list(bindings[Symbol('values')] or [])
+        body = list(bindings[Symbol('body')] or [])
+        name = bindings[Symbol('name')] if Symbol('name') in bindings else None
 
         if len(values) != len(variables):
             raise SyntaxError('let bindings need a value')
 
-        compiler = mania.compiler.SimpleCompiler(types.Nil())
-
-        for name in variables:
-            if ':' in name.value and any(c != ':' for c in name.value):
+        for variable in variables + ([] if name is None else [name]):
+            if ':' in variable.value and any(c != ':' for c in variable.value):
                 raise types.ExpandError()
 
-            compiler.builder.add(instructions.Store(
-                compiler.builder.constant(name)
+        outer = [] if name is None else [name]
+
+        resolver = self.resolver(vm)
+        environment = [resolver.level(outer, [], [], slots=True)]
+
+        values = resolver.resolve_body(values, environment)
+        body = resolver.resolve_body(
+            body,
+            [resolver.level(variables, body, environment, slots=True)] +
+            environment
+        )
+
+        compiler = mania.compiler.SimpleCompiler(types.Nil())
+
+        if variables:
+            compiler.builder.add(instructions.SetupLocals(
+                compiler.builder.constant(types.Layout(variables))
             ))
 
-        for node in bindings[Symbol('body')]:
-            compiler.compile_any(node)
-            compiler.builder.add(instructions.Eval())
+        for i, variable in enumerate(variables):
+            compiler.builder.add(instructions.StoreLocal(i))
+
+        compiler.compile_body(body, tail=True)
 
         compiler.builder.add(instructions.Return())
 
         size = compiler.builder.index()
 
+        if outer:
+            compiler.builder.add(instructions.SetupLocals(
+                compiler.builder.constant(types.Layout(outer))
+            ))
+
         compiler.builder.add(instructions.LoadCode(0, size))
         compiler.builder.add(instructions.BuildFunction())
 
-        if Symbol('name') in bindings:
-            name = bindings[Symbol('name')]
-
-            if ':' in name.value and any(c != ':' for c in name.value):
-                raise types.ExpandError()
-
-            compiler.builder.add(instructions.Store(
-                compiler.builder.constant(name)
-            ))
-            compiler.builder.add(instructions.Load(
-                compiler.builder.constant(name)
-            ))
+        if outer:
+            compiler.builder.add(instructions.StoreLocal(0))
+            compiler.builder.add(instructions.LoadLocal(0))
 
         for value in values:
-            compiler.compile_any(value)
-            compiler.builder.add(instructions.Eval())
+            compiler.compile_eval(value)
 
-        compiler.builder.add(instructions.Call(len(values)))
+        compiler.builder.add(instructions.TailCall(len(values)))
         compiler.builder.add(instructions.Return())
 
         entry_point = compiler.builder.index()
 
         compiler.builder.add(instructions.LoadCode(size, entry_point - size))
         compiler.builder.add(instructions.BuildFunction())
-        compiler.builder.add(instructions.Call(0))
+
+        if tail:
+            compiler.builder.add(instructions.TailCall(0))
+
+        else:
+            compiler.builder.add(instructions.Call(0))
 
         module = compiler.builder.module
 
@@ -493,16 +506,14 @@ class Mania(types.NativeModule):
             len(module) - module.entry_point
         )]
 
-    def if_(self, vm, bindings):
+    def if_(self, vm, bindings, tail=False):
         compiler = mania.compiler.SimpleCompiler(types.Nil())
 
-        compiler.compile_any(bindings[Symbol('condition')])
-        compiler.builder.add(instructions.Eval())
+        compiler.compile_eval(bindings[Symbol('condition')])
 
         negative_jump = compiler.builder.add(None)
 
-        compiler.compile_any(bindings[Symbol('positive')])
-        compiler.builder.add(instructions.Eval())
+        compiler.compile_eval(bindings[Symbol('positive')], tail)
 
         end_jump = compiler.builder.add(None)
 
@@ -512,8 +523,7 @@ class Mania(types.NativeModule):
         )
 
         if Symbol('negative') in bindings:
-            compiler.compile_any(bindings[Symbol('negative')])
-            compiler.builder.add(instructions.Eval())
+            compiler.compile_eval(bindings[Symbol('negative')], tail)
 
         else:
             compiler.builder.add(instructions.LoadConstant(
@@ -531,18 +541,16 @@ class Mania(types.NativeModule):
             len(module)
         )]
 
-    def and_(self, vm, bindings):
+    def and_(self, vm, bindings, tail=False):
         compiler = mania.compiler.SimpleCompiler(types.Nil())
 
-        compiler.compile_any(bindings[Symbol('left')])
-        compiler.builder.add(instructions.Eval())
+        compiler.compile_eval(bindings[Symbol('left')])
         compiler.builder.add(instructions.Duplicate(1))
 
         left_false = compiler.builder.add(None)
 
         compiler.builder.add(instructions.Pop(1))
-        compiler.compile_any(bindings[Symbol('right')])
-        compiler.builder.add(instructions.Eval())
+        compiler.compile_eval(bindings[Symbol('right')], tail)
 
         end = compiler.builder.add(instructions.Restore())
 
@@ -48,10 +48,10 @@ class Boot(types.NativeModule):
         self.register('version', ignore)
         self.register('description', ignore)
 
-    def ignore(self, vm, bindings):
+    def ignore(self, vm, bindings, tail=False):
         pass
 
-    def define_module(self, vm, bindings):
+    def define_module(self, vm, bindings, tail=False):
         name = bindings[Symbol('name')]
 
         if ':' in name.value and '' in name.value.split(':'):
@@ -74,6 +74,6 @@ class Boot(types.NativeModule):
 
         module = compiler.builder.module
 
-        vm.process.scheduler.node.registered_modules[name] = module
+        vm.process.scheduler.node.register_module(name, module)
 
         return []
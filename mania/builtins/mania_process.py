@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+'''
+   mania.builtins.mania_process
+   ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+   :copyright: (c) 2015 by Björn Schulz.
+   :license: MIT, see LICENSE for more details.
+'''
+
+from __future__ import absolute_import, division
+import logging
+import mania.compiler
+import mania.instructions as instructions
+import mania.types as types
+import mania.frame
+from mania.types import Symbol, Pair, NativeMacro, NativeRule, Pattern
+
+
+logger = logging.getLogger(__name__)
+
+
+class Process(types.NativeModule):
+
+    def __init__(self):
+        types.NativeModule.__init__(self, Symbol('mania:process'))
+
+        self.register('!', NativeMacro([NativeRule(
+            Pattern(Pair.from_sequence([
+                Symbol('_'), Symbol('pid'), Symbol('message')
+            ])),
+            self.send_
+        )]))
+
+        self.register('receive', NativeMacro([
+            NativeRule(
+                Pattern(Pair.from_sequence([Symbol('_')])),
+                self.receive
+            ),
+            NativeRule(
+                Pattern(Pair.from_sequence([Symbol('_'), Symbol('pattern')])),
+                self.receive
+            )
+        ], pure=True))
+
+    @types.export('self')
+    @types.pass_vm
+    def self_(self, vm):
+        return types.Integer(vm.process.id)
+
+    @types.export
+    @types.pass_vm
+    def send(self, vm, pid, message):
+        vm.process.scheduler.node.send(pid.value, message)
+
+        return message
+
+    @types.export
+    @types.pass_vm
+    def spawn(self, vm, function):
+        process = vm.process.scheduler.node.spawn_process(
+            code=function.code,
+            scope=mania.frame.Scope(parent=function.scope)
+        )
+
+        return types.Integer(process.id)
+
+    def send_(self, vm, bindings, tail=False):
+        compiler = mania.compiler.SimpleCompiler(types.Nil())
+
+        compiler.compile_eval(bindings[Symbol('pid')])
+        compiler.compile_eval(bindings[Symbol('message')])
+        compiler.builder.add(instructions.Send())
+        compiler.builder.add(instructions.Restore())
+
+        module = compiler.builder.module
+
+        return [module.code(
+            module.entry_point,
+            len(module)
+        )]
+
+    def receive(self, vm, bindings, tail=False):
+        compiler = mania.compiler.SimpleCompiler(types.Nil())
+
+        if Symbol('pattern') in bindings:
+            pattern = Pattern(bindings[Symbol('pattern')])
+
+        else:
+            pattern = types.Nil()
+
+        compiler.builder.add(instructions.LoadConstant(
+            compiler.builder.constant(pattern)
+        ))
+        compiler.builder.add(instructions.Receive())
+        compiler.builder.add(instructions.Restore())
+
+        module = compiler.builder.module
+
+        return [module.code(
+            module.entry_point,
+            len(module)
+        )]
@@ -13,6 +13,7 @@ import logging
 import io
 import mania.types
 import mania.instructions
+import mania.utils
 
 
 logger = logging.getLogger(__name__)
@@ -30,7 +31,8 @@ class Builder(object):
         self.name = name
         self.entry_point = entry_point
         self.constants = [name]
-        self.instructions = []
+        self.indices = {name: 0}
+        self.instructions = mania.types.Bytecode()
 
     @property
     def module(self):
@@ -42,12 +44,15 @@ class Builder(object):
         )
 
     def constant(self, value):
-        if value in self.constants:
-            return self.constants.index(value)
+        try:
+            return self.indices[value]
 
-        self.constants.append(value)
+        except KeyError:
+            index = self.indices[value] = len(self.constants)
 
-        return len(self.constants) - 1
+            self.constants.append(value)
+
+            return index
 
     def index(self):
         return len(self.instructions)
@@ -55,6 +60,9 @@ class Builder(object):
     def add(self, instruction):
         index = self.index()
 
+        if instruction is None:
+            instruction = mania.instructions.Nop()
+
         self.instructions.append(instruction)
 
         return index
@@ -86,7 +94,10 @@ class SimpleCompiler(Compiler):
         return self.builder.module
 
     def compile_any(self, code):
-        if isinstance(code, mania.types.Pair):
+        if self.literal(code):
+            self.compile_constant(code)
+
+        elif isinstance(code, mania.types.Pair):
             self.compile_pair(code)
 
         elif isinstance(code, mania.types.Quoted):
@@ -101,11 +112,49 @@ class SimpleCompiler(Compiler):
         else:
             self.compile_constant(code)
 
+    def literal(self, code):
+        return isinstance(code, (
+            mania.types.Pair,
+            mania.types.Quoted,
+            mania.types.Quasiquoted,
+            mania.types.Unquoted
+        )) and mania.types.is_serializable(code)
+
+    def compile_eval(self, code, tail=False):
+        if isinstance(code, mania.types.Pair):
+            self.compile_constant(code)
+
+        else:
+            self.compile_any(code)
+
+        if tail:
+            self.builder.add(mania.instructions.TailEval())
+
+        else:
+            self.builder.add(mania.instructions.Eval())
+
+    def compile_body(self, body, tail=False):
+        body = list(body)
+
+        for i, code in enumerate(body):
+            self.compile_eval(code, tail and i + 1 == len(body))
+
     def compile_pair(self, code):
-        self.compile_any(code.head)
-        self.compile_any(code.tail)
+        count = 0
+
+        while isinstance(code, mania.types.Pair):
+            self.compile_any(code.head)
 
-        self.builder.add(mania.instructions.BuildPair())
+            code = code.tail
+            count += 1
+
+        if code == mania.types.Nil():
+            self.builder.add(mania.instructions.BuildList(count))
+
+        else:
+            self.compile_any(code)
+
+            self.builder.add(mania.instructions.BuildList(count + 1, True))
 
     def compile_quoted(self, code):
         self.compile_any(code.value)
@@ -123,6 +172,192 @@ class SimpleCompiler(Compiler):
         self.builder.add(mania.instructions.BuildUnquoted())
 
     def compile_constant(self, code):
+        if isinstance(code, mania.types.Symbol) and ':' in code.value:
+            mania.utils.split_name(code)
+
         index = self.builder.constant(code)
 
         self.builder.add(mania.instructions.LoadConstant(index))
+
+
+class Resolver(object):
+
+    def __init__(self, frame, forms=None, functions=None):
+        self.frame = frame
+        self.forms = forms or {}
+        self.functions = set(functions or [])
+
+    def find(self, name, environment):
+        for depth, level in enumerate(environment):
+            if name in level:
+                if level[name] is None:
+                    return name
+
+                return mania.types.Local(name, depth, level[name])
+
+    def classify(self, head, environment):
+        if isinstance(head, mania.types.Local):
+            return 'call'
+
+        elif isinstance(head, mania.types.Pair):
+            return 'call'
+
+        elif not isinstance(head, mania.types.Symbol):
+            return None
+
+        for level in environment:
+            if head in level:
+                return 'call' if level[head] is not None else None
+
+        if head in self.functions:
+            return 'call'
+
+        try:
+            value = self.frame.lookup(head)
+
+        except NameError:
+            return None
+
+        if isinstance(value, mania.types.Function):
+            return 'call'
+
+        return self.forms.get(value)
+
+    def defined(self, body, environment):
+        names = []
+
+        for code in body:
+            if not isinstance(code, mania.types.Pair):
+                continue
+
+            form = self.classify(code.head, environment)
+
+            if not isinstance(code.tail, mania.types.Pair):
+                continue
+
+            target = code.tail.head
+
+            if form == 'define':
+                if isinstance(target, mania.types.Pair):
+                    target = target.head
+
+                names.append(target)
+
+            elif form == 'define-values':
+                names.extend(target or [])
+
+            elif form == 'define-syntax':
+                names.append(target)
+
+        return [name for name in names if isinstance(name, mania.types.Symbol)]
+
+    def level(self, names, body, environment, slots=False):
+        level = {}
+
+        for name in self.defined(body, environment):
+            level[name] = None
+
+        for i, name in enumerate(names):
+            level[name] = i if slots else None
+
+        return level
+
+    def resolve_body(self, body, environment):
+        return [self.resolve(code, environment) for code in body]
+
+    def resolve(self, code, environment):
+        if isinstance(code, mania.types.Symbol):
+            return self.find(code, environment) or code
+
+        elif isinstance(code, mania.types.Pair):
+            return self.resolve_pair(code, environment)
+
+        return code
+
+    def resolve_pair(self, code, environment):
+        elements = []
+        tail = code
+
+        while isinstance(tail, mania.types.Pair):
+            elements.append(tail.head)
+
+            tail = tail.tail
+
+        if tail != mania.types.Nil():
+            return code
+
+        form = self.classify(code.head, environment)
+
+        if form in ('call', 'transparent'):
+            if form == 'call':
+                elements[0] = self.resolve(elements[0], environment)
+
+            elements[1:] = self.resolve_body(elements[1:], environment)
+
+        elif form == 'lambda' and len(elements) > 2:
+            elements[2:] = self.resolve_function(
+                elements[1], elements[2:], environment
+            )
+
+        elif form == 'define' and len(elements) > 2:
+            if isinstance(elements[1], mania.types.Pair):
+                elements[2:] = self.resolve_function(
+                    elements[1].tail, elements[2:], environment
+                )
+
+            else:
+                elements[2:] = self.resolve_body(elements[2:], environment)
+
+        elif form == 'define-values' and len(elements) == 3:
+            elements[2] = self.resolve(elements[2], environment)
+
+        elif form == 'let' and len(elements) > 2:
+            if isinstance(elements[1], mania.types.Symbol):
+                outer = {elements[1]: None}
+                index = 2
+
+            else:
+                outer = {}
+                index = 1
+
+            environment = [outer] + list(environment)
+            bindings = []
+
+            for binding in elements[index] or []:
+                if (isinstance(binding, mania.types.Pair) and
+                        isinstance(binding.tail, mania.types.Pair)):
+                    binding = mania.types.Pair(
+                        binding.head,
+                        mania.types.Pair(
+                            self.resolve(binding.tail.head, environment),
+                            binding.tail.tail
+                        )
+                    )
+
+                bindings.append(binding)
+
+            elements[index] = mania.types.Pair.from_sequence(bindings)
+            elements[index + 1:] = self.resolve_function(
+                [
+                    pair.head for pair in bindings
+                    if isinstance(pair, mania.types.Pair)
+                ],
+                elements[index + 1:],
+                environment
+            )
+
+        else:
+            return code
+
+        return mania.types.Pair.from_sequence(elements)
+
+    def resolve_function(self, parameters, body, environment):
+        names = [
+            name for name in parameters or []
+            if isinstance(name, mania.types.Symbol)
+        ]
+
+        return self.resolve_body(
+            body,
+            [self.level(names, body, environment)] + list(environment)
+        )
@@ -16,14 +16,18 @@ logger = logging.getLogger(__name__)
 
 
 # Types
-ELLIPSIS  = 0x00
-UNDEFINED = 0x01
-NIL       = 0x02
-BOOLEAN   = 0x03
-INTEGER   = 0x04
-FLOAT     = 0x05
-SYMBOL    = 0x06
-STRING    = 0x07
+ELLIPSIS    = 0x00
+UNDEFINED   = 0x01
+NIL         = 0x02
+BOOLEAN     = 0x03
+INTEGER     = 0x04
+FLOAT       = 0x05
+SYMBOL      = 0x06
+STRING      = 0x07
+PAIR        = 0x08
+QUOTED      = 0x09
+QUASIQUOTED = 0x0a
+UNQUOTED    = 0x0b
 
 
 # Opcodes
@@ -37,6 +41,9 @@ LOAD_FIELD         = 0x15
 LOAD_CONSTANT      = 0x16
 LOAD_CODE          = 0x17
 LOAD_MODULE        = 0x18
+LOAD_LOCAL         = 0x19
+STORE_LOCAL        = 0x1a
+SETUP_LOCALS       = 0x1b
 NEGATE             = 0x20
 ADD                = 0x21
 SUB                = 0x22
@@ -78,6 +85,8 @@ RETURN             = 0x59
 THROW              = 0x5a
 SETUP_CATCH        = 0x5b
 END_CATCH          = 0x5c
+TAIL_CALL          = 0x5d
+TAIL_APPLY         = 0x5e
 SPAWN              = 0x60
 EXIT               = 0x61
 SEND               = 0x62
@@ -101,4 +110,19 @@ BUILD_PATTERN      = 0x88
 BUILD_TEMPLATE     = 0x89
 BUILD_CONTINUATION = 0x8a
 BUILD_MODULE       = 0x8b
+BUILD_REST         = 0x8c
 EVAL               = 0x90
+TAIL_EVAL          = 0x91
+
+
+# Module formats
+FORMAT_V1 = 0x00
+FORMAT_V2 = 0x02
+
+
+# Module sections
+SECTION_STRINGS   = 0x01
+SECTION_CONSTANTS = 0x02
+SECTION_CODE      = 0x03
+SECTION_EXPORTS   = 0x04
+SECTION_DEBUG     = 0x05
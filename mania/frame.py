@@ -10,12 +10,23 @@
 
 from __future__ import absolute_import
 import logging
+import itertools
 import mania.types
 
 
 logger = logging.getLogger(__name__)
 
 
+versions = itertools.count(1)
+version = next(versions)
+
+
+def invalidate():
+    global version
+
+    version = next(versions)
+
+
 class StackEmptyException(Exception):
     pass
 
@@ -44,13 +55,28 @@ class Stack(list):
 
 class Scope(object):
 
-    def __init__(self, parent=None, locals=None):
+    __slots__ = ('parent', 'locals', 'layout', 'slots', 'module')
+
+    def __init__(self, parent=None, locals=None, layout=None):
         self.parent = parent
-        self.locals = locals or {}
+        self.locals = locals
+        self.layout = None
+        self.slots = None
+        self.module = None
+
+        if layout is not None:
+            self.setup(layout)
+
+    def setup(self, layout):
+        self.layout = layout
+        self.slots = [None] * len(layout)
 
     def define(self, name, value):
+        if self.locals is None:
+            self.locals = {}
+
         if name in self.locals:
-            if isinstance(self.locals[name], types.Annotation):
+            if isinstance(self.locals[name], mania.types.Annotation):
                 value.annotation = self.locals[name]
                 self.locals[name] = value
 
@@ -58,25 +84,58 @@ class Scope(object):
 
             raise NameError('name {0!r} already defined'.format(name))
 
+        if self.layout is not None and name in self.layout.indices:
+            raise NameError('name {0!r} already defined'.format(name))
+
         self.locals[name] = value
 
+        invalidate()
+
         return value
 
     def lookup(self, name):
-        if name in self.locals:
-            if isinstance(self.locals[name], mania.types.Annotation):
-                raise NameError('name {0!r} not defined'.format(name))
+        return self.resolve(name)[0]
 
-            return self.locals[name]
+    def resolve(self, name):
+        scope = self
 
-        elif self.parent:
-            return self.parent.lookup(name)
+        while scope is not None:
+            if scope.locals and name in scope.locals:
+                value = scope.locals[name]
+
+                if isinstance(value, mania.types.Annotation):
+                    break
+
+                return value, True
+
+            elif scope.layout is not None and name in scope.layout.indices:
+                return scope.slots[scope.layout.indices[name]], False
+
+            scope = scope.parent
 
         raise NameError('name {0!r} not defined'.format(name))
 
+    def anchor(self, name):
+        if self.locals or (
+            self.layout is not None and name in self.layout.indices
+        ):
+            return self
+
+        return self.parent
+
+    def load(self, depth, index):
+        scope = self
+
+        for _ in xrange(depth):
+            scope = scope.parent
+
+        return scope.slots[index]
+
 
 class Frame(object):
 
+    __slots__ = ('code', 'scope', 'parent', 'position', 'stack')
+
     def __init__(self, code, scope=None, stack=None, parent=None):
         self.code = code
         self.scope = scope or Scope(parent.scope if parent else None)
@@ -109,18 +168,34 @@ class Frame(object):
         return self.scope.define(name, value)
 
     def lookup(self, name):
+        return self.resolve(name)[0]
+
+    def resolve(self, name):
         try:
-            return self.scope.lookup(name)
+            return self.scope.resolve(name)
 
         except NameError as e:
             for parts in mania.utils.split_name(name):
                 value = self.scope
+                cacheable = True
 
                 try:
                     for part in parts:
-                        value = value.lookup(part)
+                        if isinstance(value, Scope):
+                            value, found = value.resolve(part)
+
+                        elif (
+                            isinstance(value, mania.types.Module) and
+                            value.scope is not None
+                        ):
+                            value, found = value.scope.resolve(part)
+
+                        else:
+                            value, found = value.lookup(part), False
+
+                        cacheable = cacheable and found
 
-                    return value
+                    return value, cacheable
 
                 except NameError:
                     continue
@@ -11,6 +11,7 @@
 from __future__ import absolute_import
 import logging
 import struct
+import weakref
 import mania.consts as consts
 import mania.node as node
 import mania.compiler
@@ -22,11 +23,22 @@ import mania.utils
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_CALL_CACHE_SIZE = 4096
+
+
 opcodes = {}
+handlers = {}
+decoders = {}
 
 def opcode(opcode):
     def _inner(cls):
         opcodes[opcode] = cls
+        handlers[opcode] = cls.eval
+        decoders[chr(opcode)] = (
+            cls,
+            cls.operands,
+            cls.operands.size if cls.operands else 0
+        )
 
         cls.opcode = opcode
 
@@ -35,152 +47,212 @@ def opcode(opcode):
     return _inner
 
 
+call_cache = mania.utils.ExpressionCache(DEFAULT_CALL_CACHE_SIZE)
+instances = weakref.WeakValueDictionary()
+
+
+def lookup(vm, name):
+    frame = vm.frame
+    anchor = frame.scope.anchor(name)
+    caches = frame.code.module.caches
+    cache = caches.get(frame.position - 1)
+
+    if (
+        cache is not None and
+        cache[0] is name and
+        cache[1] is anchor and
+        cache[2] == mania.frame.version
+    ):
+        return cache[3]
+
+    version = mania.frame.version
+    value, cacheable = frame.resolve(name)
+
+    if cacheable:
+        caches[frame.position - 1] = (name, anchor, version, value)
+
+    return value
+
+
+class MetaInstruction(type):
+
+    def __call__(cls, *args):
+        if not cls.shared:
+            return type.__call__(cls, *args)
+
+        key = (cls,) + args
+
+        try:
+            return instances[key]
+
+        except KeyError:
+            instruction = type.__call__(cls, *args)
+
+            instances[key] = instruction
+
+            return instruction
+
+
 class Instruction(object):
 
+    __metaclass__ = MetaInstruction
+
+    operands = None
+    fields = ()
+    shared = True
+
     @property
-    def size(self):
-        return struct.calcsize('<B')
+    def arguments(self):
+        return tuple(getattr(self, field) for field in self.fields)
 
-    @classmethod
-    def load(cls, stream):
-        return cls()
+    @staticmethod
+    def operand(vm):
+        frame = vm.frame
 
-    def dump(self, stream):
-        stream.write(struct.pack('<B', self.opcode))
+        return frame.code.module.instructions.operand(frame.position - 1)
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         raise NotImplementedError('"eval" needs to be implemented in subclasses')
 
 
 @opcode(consts.NOP)
 class Nop(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         pass
 
 
 class StackOperation(Instruction):
 
+    operands = struct.Struct('<I')
+    fields = ('count',)
+
     def __init__(self, count):
         self.count = count
 
-    @property
-    def size(self):
-        return super(StackOperation, self).size + struct.calcsize('<I')
-
-    @classmethod
-    def load(cls, stream):
-        (index,) = struct.unpack('<I', stream.read(struct.calcsize('<I')))
-
-        return cls(index)
-
-    def dump(self, stream):
-        super(StackOperation, self).dump(stream)
-
-        stream.write(struct.pack('<I', self.index))
-
 
 @opcode(consts.DUPLICATE)
 class Duplicate(StackOperation):
 
-    def eval(self, vm):
-        vm.frame.stack.extend(vm.frame.stack[-self.count:])
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.stack.extend(vm.frame.stack[-argument:])
 
 
 @opcode(consts.ROTATE)
 class Rotate(StackOperation):
 
-    def eval(self, vm):
-        vm.frame.stack[-self.number:] = vm.frame.stack[-self.count:][::-1]
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.stack[-argument:] = vm.frame.stack[-argument:][::-1]
 
 
 @opcode(consts.POP)
 class Pop(StackOperation):
 
-    def eval(self, vm):
-        for _ in xrange(self.count):
+    @classmethod
+    def eval(cls, vm, argument):
+        for _ in xrange(argument):
             vm.frame.pop()
 
 
 class LoadStoreOperation(Instruction):
 
+    operands = struct.Struct('<I')
+    fields = ('index',)
+
     def __init__(self, index):
         self.index = index
 
-    @property
-    def size(self):
-        return super(LoadStoreOperation, self).size + struct.calcsize('<I')
-
-    @classmethod
-    def load(cls, stream):
-        (index,) = struct.unpack('<I', stream.read(struct.calcsize('<I')))
-
-        return cls(index)
-
-    def dump(self, stream):
-        super(LoadStoreOperation, self).dump(stream)
-
-        stream.write(struct.pack('<I', self.index))
-
 
 @opcode(consts.STORE)
 class Store(LoadStoreOperation):
 
-    def eval(self, vm):
-        vm.frame.define(vm.frame.constant(self.index), vm.frame.pop())
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.define(vm.frame.constant(argument), vm.frame.pop())
 
 
 @opcode(consts.LOAD)
 class Load(LoadStoreOperation):
 
-    def eval(self, vm):
-        vm.frame.push(vm.frame.lookup(vm.frame.constant(self.index)))
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.push(lookup(vm, vm.frame.constant(argument)))
 
 
 @opcode(consts.LOAD_FIELD)
 class LoadField(LoadStoreOperation):
 
-    def eval(self, vm):
-        vm.frame.push(vm.frame.pop().lookup(vm.frame.constant(self.index)))
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.push(vm.frame.pop().lookup(vm.frame.constant(argument)))
 
 
 @opcode(consts.LOAD_CONSTANT)
 class LoadConstant(LoadStoreOperation):
 
-    def eval(self, vm):
-        vm.frame.push(vm.frame.constant(self.index))
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.push(vm.frame.constant(argument))
 
 
-@opcode(consts.LOAD_CODE)
-class LoadCode(Instruction):
+@opcode(consts.LOAD_LOCAL)
+class LoadLocal(LoadStoreOperation):
 
-    def __init__(self, entry_point, size):
-        self.entry_point = entry_point
-        self._size = size
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.push(vm.frame.scope.slots[argument])
+
+
+@opcode(consts.STORE_LOCAL)
+class StoreLocal(LoadStoreOperation):
+
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.scope.slots[argument] = vm.frame.pop()
 
-    @property
-    def size(self):
-        return super(LoadCode, self).size + struct.calcsize('<II')
+
+@opcode(consts.SETUP_LOCALS)
+class SetupLocals(LoadStoreOperation):
 
     @classmethod
-    def load(cls, stream):
-        (entry, size) = struct.unpack('<II', stream.read(struct.calcsize('<II')))
+    def eval(cls, vm, argument):
+        frame = vm.frame
+        scope = frame.scope
+
+        if (
+            scope.layout is not None or scope.locals or
+            frame.position != frame.code.entry_point + 1 or
+            (frame.parent is not None and frame.parent.scope is scope)
+        ):
+            mania.frame.invalidate()
 
-        return cls(entry, size)
+        scope.setup(frame.constant(argument))
 
-    def dump(self, stream):
-        super(LoadCode, self).dump(stream)
 
-        stream.write(struct.pack('<II', self.entry_point, self._size))
+@opcode(consts.LOAD_CODE)
+class LoadCode(Instruction):
 
-    def eval(self, vm):
-        vm.frame.push(vm.frame.code.module.code(self.entry_point, self._size))
+    operands = struct.Struct('<II')
+    fields = ('entry_point', 'size')
+
+    def __init__(self, entry_point, size):
+        self.entry_point = entry_point
+        self.size = size
+
+    @classmethod
+    def eval(cls, vm, argument):
+        vm.frame.push(vm.frame.code.module.code(argument, cls.operand(vm)))
 
 
 @opcode(consts.LOAD_MODULE)
 class LoadModule(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         name = vm.frame.pop()
 
         try:
@@ -190,7 +262,9 @@ class LoadModule(Instruction):
 
             vm.frame.push(module)
 
-        except LoadingDeferred:
+        except node.LoadingDeferred:
+            vm.frame.push(name)
+
             vm.process.status = node.WAITING_FOR_MODULE
             vm.process.waiting_for = name
             vm.frame.position -= 1
@@ -201,7 +275,8 @@ class LoadModule(Instruction):
 @opcode(consts.ADD)
 class Add(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         y = vm.frame.pop()
         x = vm.frame.pop()
 
@@ -211,7 +286,8 @@ class Add(Instruction):
 @opcode(consts.SUB)
 class Sub(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         y = vm.frame.pop()
         x = vm.frame.pop()
 
@@ -221,7 +297,8 @@ class Sub(Instruction):
 @opcode(consts.MUL)
 class Mul(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         y = vm.frame.pop()
         x = vm.frame.pop()
 
@@ -231,52 +308,112 @@ class Mul(Instruction):
 @opcode(consts.HEAD)
 class Head(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.frame.push(vm.frame.pop().head)
 
 
-@opcode(consts.HEAD)
+@opcode(consts.TAIL)
 class Tail(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.frame.push(vm.frame.pop().tail)
 
 
 @opcode(consts.BUILD_QUOTED)
 class BuildQuoted(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.frame.push(mania.types.Quoted(vm.frame.pop()))
 
 
 @opcode(consts.BUILD_QUASIQUOTED)
 class BuildQuasiquoted(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.frame.push(mania.types.Quasiquoted(vm.frame.pop()))
 
 
 @opcode(consts.BUILD_UNQUOTED)
 class BuildUnquoted(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.frame.push(mania.types.Unquoted(vm.frame.pop()))
 
 
 @opcode(consts.BUILD_PAIR)
 class BuildPair(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         tail = vm.frame.pop()
         head = vm.frame.pop()
 
         vm.frame.push(mania.types.Pair(head, tail))
 
 
+@opcode(consts.BUILD_LIST)
+class BuildList(Instruction):
+
+    operands = struct.Struct('<II')
+    fields = ('count', 'dotted')
+
+    def __init__(self, count, dotted=0):
+        self.count = count
+        self.dotted = int(dotted)
+
+    @classmethod
+    def eval(cls, vm, argument):
+        stack = vm.frame.stack
+
+        if argument > len(stack):
+            raise mania.frame.StackEmptyException()
+
+        elif argument == 0:
+            vm.frame.push(mania.types.Nil())
+
+            return
+
+        elements = stack[-argument:]
+        del stack[-argument:]
+
+        if cls.operand(vm):
+            result = elements.pop()
+
+        else:
+            result = mania.types.Nil()
+
+        for element in reversed(elements):
+            result = mania.types.Pair(element, result)
+
+        vm.frame.push(result)
+
+
+@opcode(consts.BUILD_REST)
+class BuildRest(Instruction):
+
+    @classmethod
+    def eval(cls, vm, argument):
+        stack = vm.frame.stack
+        result = mania.types.Nil()
+
+        for element in stack:
+            result = mania.types.Pair(element, result)
+
+        del stack[:]
+
+        vm.frame.push(result)
+
+
 @opcode(consts.BUILD_FUNCTION)
 class BuildFunction(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         code = vm.frame.pop()
 
         vm.frame.push(mania.types.Function(code, vm.frame.scope))
@@ -285,21 +422,15 @@ class BuildFunction(Instruction):
 @opcode(consts.BUILD_MACRO)
 class BuildMacro(Instruction):
 
+    operands = struct.Struct('<I')
+    fields = ('count',)
+
     def __init__(self, count):
         self.count = count
 
-    @property
-    def size(self):
-        return super(BuildMacro, self).size + struct.calcsize('<I')
-
     @classmethod
-    def load(cls, stream):
-        (count,) = struct.unpack('<I', stream.read(struct.calcsize('<I')))
-
-        return cls(count)
-
-    def eval(self, vm):
-        rules = [vm.frame.pop() for _ in xrange(self.count)][::-1]
+    def eval(cls, vm, argument):
+        rules = [vm.frame.pop() for _ in xrange(argument)][::-1]
 
         vm.frame.push(mania.types.Macro(rules))
 
@@ -307,7 +438,8 @@ class BuildMacro(Instruction):
 @opcode(consts.BUILD_RULE)
 class BuildRule(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         templates = vm.frame.pop()
         pattern = vm.frame.pop()
 
@@ -317,28 +449,23 @@ class BuildRule(Instruction):
 @opcode(consts.BUILD_PATTERN)
 class BuildPattern(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.frame.push(mania.types.Pattern(vm.frame.pop()))
 
 
 @opcode(consts.BUILD_TEMPLATE)
 class BuildTemplate(Instruction):
 
+    operands = struct.Struct('<I')
+    fields = ('count',)
+
     def __init__(self, count):
         self.count = count
 
-    @property
-    def size(self):
-        return super(BuildTemplate, self).size + struct.calcsize('<I')
-
     @classmethod
-    def load(cls, stream):
-        (count,) = struct.unpack('<I', stream.read(struct.calcsize('<I')))
-
-        return cls(count)
-
-    def eval(self, vm):
-        templates = [vm.frame.pop() for _ in xrange(self.count)][::-1]
+    def eval(cls, vm, argument):
+        templates = [vm.frame.pop() for _ in xrange(argument)][::-1]
 
         vm.frame.push([
             mania.types.Template(template) for template in templates
@@ -348,7 +475,8 @@ class BuildTemplate(Instruction):
 @opcode(consts.EXIT)
 class Exit(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.process.status = node.EXITING
 
         raise node.Schedule()
@@ -357,123 +485,103 @@ class Exit(Instruction):
 @opcode(consts.JUMP)
 class Jump(Instruction):
 
+    operands = struct.Struct('<I')
+    fields = ('position',)
+
     def __init__(self, position):
         self.position = position
 
-    @property
-    def size(self):
-        return super(Jump, self).size + struct.calcsize('<I')
-
     @classmethod
-    def load(cls, stream):
-        (position,) = struct.unpack('<I', stream.read(struct.calcsize('<I')))
-
-        return cls(position)
-
-    def dump(self, stream):
-        super(Jump, self).dump(stream)
-
-        stream.write(struct.pack('<I', self.number))
-
-    def eval(self, vm):
-        vm.frame.position = self.position
+    def eval(cls, vm, argument):
+        vm.frame.position = argument
 
 
 @opcode(consts.JUMP_IF_NIL)
 class JumpIfNil(Jump):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         if vm.frame.pop() == mania.types.Nil():
-            vm.frame.position = self.position
+            vm.frame.position = argument
 
 
 @opcode(consts.JUMP_IF_TRUE)
 class JumpIfTrue(Jump):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         if vm.frame.pop() == mania.types.Bool(True):
-            vm.frame.position = self.position
+            vm.frame.position = argument
 
 
 @opcode(consts.JUMP_IF_FALSE)
 class JumpIfFalse(Jump):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         if vm.frame.pop() == mania.types.Bool(False):
-            vm.frame.position = self.position
+            vm.frame.position = argument
 
 
 @opcode(consts.JUMP_IF_EMPTY)
 class JumpIfEmpty(Jump):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         if len(vm.frame.stack) == 0:
-            vm.frame.position = self.position
+            vm.frame.position = argument
 
 
 @opcode(consts.JUMP_IF_NOT_EMPTY)
 class JumpIfNotEmpty(Jump):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         if len(vm.frame.stack) != 0:
-            vm.frame.position = self.position
+            vm.frame.position = argument
 
 
 @opcode(consts.JUMP_IF_SIZE)
 class JumpIfSize(Jump):
 
+    operands = struct.Struct('<II')
+    fields = ('size', 'position')
+
     def __init__(self, size, position):
-        self.size_ = size
+        self.size = size
         self.position = position
 
-    @property
-    def size(self):
-        return super(JumpIfSize, self).size + struct.calcsize('<II')
-
     @classmethod
-    def load(cls, stream):
-        (size, position) = struct.unpack('<II', stream.read(struct.calcsize('<II')))
-
-        return cls(size, position)
-
-    def dump(self, stream):
-        super(JumpIfSize, self).dump(stream)
-
-        stream.write(struct.pack('<II', self.number))
-
-    def eval(self, vm):
-        if len(vm.frame.stack) == self.size_:
-            vm.frame.position = self.position
+    def eval(cls, vm, argument):
+        if len(vm.frame.stack) == argument:
+            vm.frame.position = cls.operand(vm)
 
 
 @opcode(consts.CALL)
 class Call(Instruction):
 
+    operands = struct.Struct('<I')
+    fields = ('number',)
+
     def __init__(self, number):
         self.number = number
 
-    @property
-    def size(self):
-        return super(Call, self).size + struct.calcsize('<I')
-
     @classmethod
-    def load(cls, stream):
-        (number,) = struct.unpack('<I', stream.read(struct.calcsize('<I')))
-
-        return cls(number)
-
-    def dump(self, stream):
-        super(Call, self).dump(stream)
-
-        stream.write(struct.pack('<I', self.number))
-
-    def eval(self, vm):
-        args = [vm.frame.pop() for _ in xrange(self.number)]
+    def eval(cls, vm, argument):
+        args = [vm.frame.pop() for _ in xrange(argument)]
 
         callable = vm.frame.pop()
 
+        cls.call(vm, callable, args)
+
+    @classmethod
+    def call(cls, vm, callable, args):
         if isinstance(callable, mania.types.NativeFunction):
-            result = callable(*args[::-1])
+            if callable.pass_vm:
+                result = callable(vm, *args[::-1])
+
+            else:
+                result = callable(*args[::-1])
 
             if result is None:
                 result = mania.types.Undefined()
@@ -492,33 +600,47 @@ class Call(Instruction):
 @opcode(consts.APPLY)
 class Apply(Call):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         list = (vm.frame.pop() or [])[::-1]
-        args = list + [vm.frame.pop() for _ in xrange(self.number)]
+        args = list + [vm.frame.pop() for _ in xrange(argument)]
 
         callable = vm.frame.pop()
 
+        cls.call(vm, callable, args)
+
+
+@opcode(consts.TAIL_CALL)
+class TailCall(Call):
+
+    @classmethod
+    def call(cls, vm, callable, args):
         if isinstance(callable, mania.types.NativeFunction):
-            result = callable(*args[::-1])
+            return Call.call(vm, callable, args)
 
-            if result is None:
-                result = mania.types.Undefined()
+        frame = vm.frame
 
-            vm.frame.push(result)
+        while frame.parent is not None and frame.stack is frame.parent.stack:
+            frame = frame.parent
+
+        frame.code = callable.code
+        frame.position = callable.code.entry_point
+        frame.scope = mania.frame.Scope(parent=callable.scope)
+        frame.stack = mania.frame.Stack(args)
+
+        vm.frame = frame
 
-        else:
-            vm.frame = mania.frame.Frame(
-                parent=vm.frame,
-                scope=mania.frame.Scope(parent=callable.scope),
-                code=callable.code,
-                stack=mania.frame.Stack(args)
-            )
+
+@opcode(consts.TAIL_APPLY)
+class TailApply(TailCall, Apply):
+    pass
 
 
 @opcode(consts.RETURN)
 class Return(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         value = vm.frame.stack.pop()
 
         vm.restore()
@@ -529,14 +651,16 @@ class Return(Instruction):
 @opcode(consts.RESTORE)
 class Restore(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         vm.restore()
 
 
 @opcode(consts.REVERSE)
 class Reverse(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         if isinstance(vm.frame.peek(), mania.types.Pair):
             vm.frame.push(mania.types.Pair.from_sequence(vm.frame.pop()[::-1]))
 
@@ -544,23 +668,19 @@ class Reverse(Instruction):
 @opcode(consts.EVAL)
 class Eval(Instruction):
 
-    def __init__(self):
-        self.evaluators = {
-            mania.types.Symbol: self.eval_symbol,
-            mania.types.Pair: self.eval_pair,
-            mania.types.Quoted: self.eval_quoted,
-            mania.types.Quasiquoted: self.eval_quasiquoted,
-            mania.types.Ellipsis: self.eval_constant,
-            mania.types.Undefined: self.eval_constant,
-            mania.types.Nil: self.eval_constant,
-            mania.types.Bool: self.eval_constant,
-            mania.types.Integer: self.eval_constant,
-            mania.types.Float: self.eval_constant,
-            mania.types.String: self.eval_constant
-        }
-
-    def expand_macro(self, vm, macro, expression):
-        result = (macro.expand(vm, expression) or [])[::-1]
+    tail = False
+    evaluators = {}
+
+    @classmethod
+    def expand_macro(cls, vm, macro, expression):
+        if vm.profile is not None:
+            vm.profile.expand_macro(macro, expression.head)
+
+        result = (macro.expand(vm, expression, cls.tail) or [])[::-1]
+
+        if vm.profile is not None:
+            for code in result:
+                vm.profile.name_frame(code, 'expansion', macro)
 
         if result:
             for code in result:
@@ -574,7 +694,32 @@ class Eval(Instruction):
         else:
             vm.frame.push(mania.types.Undefined())
 
-    def compile_call(self, vm, expression):
+    @classmethod
+    def compile_call(cls, vm, expression):
+        if vm.profile is not None:
+            vm.profile.compile_call()
+
+        code = call_cache.get(expression, cls.tail)
+
+        if code is None:
+            code = call_cache.put(
+                expression,
+                cls.tail,
+                cls.build_call(vm, expression)
+            )
+
+        if vm.profile is not None:
+            vm.profile.name_frame(code, 'call', expression.head)
+
+        vm.frame = mania.frame.Frame(
+            parent=vm.frame,
+            scope=vm.frame.scope,
+            stack=vm.frame.stack,
+            code=code
+        )
+
+    @classmethod
+    def build_call(cls, vm, expression):
         compiler = mania.compiler.SimpleCompiler()
         n = -1
         call = True
@@ -584,42 +729,40 @@ class Eval(Instruction):
                 if expression.tail != mania.types.Nil():
                     vm.throw('eval-error', expression)
 
-                    return
-
                 call = False
                 n -= 1
 
                 break
 
-            compiler.compile_any(expression.head)
-            compiler.builder.add(Eval())
+            compiler.compile_eval(expression.head)
 
             expression = expression.tail
             n += 1
 
-        compiler.builder.add((Call if call else Apply)(n))
+        if cls.tail:
+            compiler.builder.add((TailCall if call else TailApply)(n))
+
+        else:
+            compiler.builder.add((Call if call else Apply)(n))
 
         module = compiler.builder.module
 
-        vm.frame = mania.frame.Frame(
-            parent=vm.frame,
-            scope=vm.frame.scope,
-            stack=vm.frame.stack,
-            code=module.code(
-                module.entry_point,
-                len(module) - module.entry_point
-            )
+        return module.code(
+            module.entry_point,
+            len(module) - module.entry_point
         )
 
-    def eval_constant(self, vm, expression):
+    @classmethod
+    def eval_constant(cls, vm, expression):
         vm.frame.push(expression)
 
-    def eval_symbol(self, vm, expression):
-        evalable = vm.frame.lookup(expression)
+    @classmethod
+    def eval_symbol(cls, vm, expression):
+        evalable = lookup(vm, expression)
 
         if isinstance(evalable, mania.types.Macro):
             try:
-                self.expand_macro(vm, evalable, expression)
+                cls.expand_macro(vm, evalable, expression)
 
                 return
 
@@ -628,45 +771,92 @@ class Eval(Instruction):
 
         vm.frame.push(evalable)
 
-    def eval_pair(self, vm, expression):
-        if isinstance(expression.head, mania.types.Symbol):
-            evalable = vm.frame.lookup(expression.head)
+    @classmethod
+    def eval_local(cls, vm, expression):
+        vm.frame.push(vm.frame.scope.load(expression.depth, expression.index))
+
+    @classmethod
+    def eval_pair(cls, vm, expression):
+        if isinstance(expression.head, (mania.types.Symbol, mania.types.Local)):
+            if isinstance(expression.head, mania.types.Local):
+                evalable = vm.frame.scope.load(
+                    expression.head.depth,
+                    expression.head.index
+                )
+
+            else:
+                evalable = lookup(vm, expression.head)
 
             if isinstance(evalable, mania.types.Function):
-                self.compile_call(vm, expression)
+                cls.compile_call(vm, expression)
 
             elif isinstance(evalable, mania.types.Macro):
-                self.expand_macro(vm, evalable, expression)
+                cls.expand_macro(vm, evalable, expression)
 
             else:
                 vm.throw('eval-error', expression)
 
         elif isinstance(expression.head, mania.types.Pair):
-            self.compile_call(vm, expression)
+            cls.compile_call(vm, expression)
 
         else:
             vm.throw('eval-error', expression)
 
-    def eval_quasiquoted(self, vm, expression):
+    @classmethod
+    def eval_quasiquoted(cls, vm, expression):
         pass
 
-    def eval_quoted(self, vm, expression):
+    @classmethod
+    def eval_quoted(cls, vm, expression):
         vm.frame.push(expression.value)
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         expression = vm.frame.pop()
 
         try:
-            self.evaluators[type(expression)](vm, expression)
+            evaluator = cls.evaluators[type(expression)]
 
         except KeyError:
-            vm.throw('eval-error', expression)
+            evaluator = cls.evaluator(vm, expression)
+
+        evaluator(cls, vm, expression)
+
+    @classmethod
+    def evaluator(cls, vm, expression):
+        if not Eval.evaluators:
+            Eval.evaluators.update({
+                mania.types.Symbol: Eval.eval_symbol.__func__,
+                mania.types.Pair: Eval.eval_pair.__func__,
+                mania.types.Quoted: Eval.eval_quoted.__func__,
+                mania.types.Quasiquoted: Eval.eval_quasiquoted.__func__,
+                mania.types.Ellipsis: Eval.eval_constant.__func__,
+                mania.types.Undefined: Eval.eval_constant.__func__,
+                mania.types.Nil: Eval.eval_constant.__func__,
+                mania.types.Bool: Eval.eval_constant.__func__,
+                mania.types.Integer: Eval.eval_constant.__func__,
+                mania.types.Float: Eval.eval_constant.__func__,
+                mania.types.String: Eval.eval_constant.__func__,
+                mania.types.Local: Eval.eval_local.__func__
+            })
+
+            if type(expression) in Eval.evaluators:
+                return Eval.evaluators[type(expression)]
+
+        vm.throw('eval-error', expression)
+
+
+@opcode(consts.TAIL_EVAL)
+class TailEval(Eval):
+
+    tail = True
 
 
 @opcode(consts.BUILD_MODULE)
 class BuildModule(Instruction):
 
-    def eval(self, vm):
+    @classmethod
+    def eval(cls, vm, argument):
         exports = vm.frame.pop()
         name = vm.frame.pop()
 
@@ -681,21 +871,48 @@ class BuildModule(Instruction):
             name=name,
             entry_point=0,
             constants=[],
-            instructions=[],
-            scope=scope
+            instructions=mania.types.Bytecode(),
+            scope=scope,
+            exports=list(exports)
+        )
+
+        vm.process.scheduler.node.publish_module(
+            name,
+            module,
+            vm.frame.code.module
         )
 
-        vm.process.scheduler.node.loaded_modules[name] = module
 
+@opcode(consts.SEND)
+class Send(Instruction):
+
+    @classmethod
+    def eval(cls, vm, argument):
+        message = vm.frame.pop()
+        pid = vm.frame.pop()
+
+        vm.process.scheduler.node.send(pid.value, message)
+
+        vm.frame.push(message)
 
+
+@opcode(consts.RECEIVE)
 class Receive(Instruction):
 
-    def eval(self, vm):
-        if vm.process.queue.empty():
-            vm.process.status = WAITING_FOR_MESSAGE
+    @classmethod
+    def eval(cls, vm, argument):
+        pattern = vm.frame.peek()
+
+        if isinstance(pattern, mania.types.Nil):
+            pattern = None
+
+        message = vm.process.mailbox.receive(pattern)
+
+        if message is None:
+            vm.process.status = node.WAITING_FOR_MESSAGE
             vm.frame.position -= 1
 
-            raise Schedule()
+            raise node.Schedule()
 
-        else:
-            vm.frame.push(vm.process.queue.get())
+        vm.frame.pop()
+        vm.frame.push(message)
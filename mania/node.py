@@ -18,12 +18,17 @@ import multiprocessing
 import threading
 import importlib
 import pkgutil
-import Queue as queue
-import operator
 import traceback
+import heapq
+import collections
+import weakref
+import itertools
 import mania.builtins
+import mania.consts
 import mania.instructions
 import mania.types
+import mania.profile
+import mania.frame
 from mania.frame import Frame, Scope, Stack
 
 
@@ -31,6 +36,26 @@ logger = logging.getLogger(__name__)
 
 
 DEFAULT_TICK_LIMIT = 1024
+DEFAULT_STEAL_AFFINITY = 4
+
+
+THREAD_BACKEND = 'thread'
+PROCESS_BACKEND = 'process'
+DEFAULT_BACKEND = THREAD_BACKEND
+
+
+TICK_ENGINE = 'tick'
+FAST_ENGINE = 'fast'
+DEFAULT_ENGINE = FAST_ENGINE
+
+
+LOAD_CONSTANT = mania.consts.LOAD_CONSTANT
+LOAD_LOCAL = mania.consts.LOAD_LOCAL
+STORE = mania.consts.STORE
+STORE_LOCAL = mania.consts.STORE_LOCAL
+BUILD_PAIR = mania.consts.BUILD_PAIR
+JUMP = mania.consts.JUMP
+JUMP_IF_FALSE = mania.consts.JUMP_IF_FALSE
 
 
 RUNNING = 'running'
@@ -49,22 +74,47 @@ class LoadingDeferred(Exception):
 
 class Node(object):
 
-    def __init__(self, tick_limit, scheduler_count, paths):
+    def __init__(self, tick_limit, scheduler_count, paths, engine=DEFAULT_ENGINE,
+                 backend=DEFAULT_BACKEND, profile=False, sample_file=None):
         self.tick_limit = tick_limit
         self.scheduler_count = scheduler_count
         self.paths = paths
+        self.engine = engine
+        self.backend = backend
+        self.profile = mania.profile.Profile() if profile else None
+        self.sample_file = sample_file
+        self.sampler = None
         self.schedulers = []
+        self.processes = {}
         self.registered_modules = {}
+        self.loading_modules = {}
         self.loaded_modules = {}
+        self.module_waiters = {}
         self._next_id = 0
+        self.shared_id = None
+        self.control = None
+
+        if backend == PROCESS_BACKEND:
+            self.shared_id = multiprocessing.Value('L', 0)
+            self.control = multiprocessing.Queue()
         self.id_lock = threading.Lock()
         self.spawn_lock = threading.Lock()
         self.load_lock = threading.Lock()
         self.started = threading.Lock()
         self.scheduled_processes = []
+        self.process_count = 0
+        self.idle = threading.Condition()
 
     @property
     def next_pid(self):
+        if self.shared_id is not None:
+            with self.shared_id.get_lock():
+                pid = self.shared_id.value
+
+                self.shared_id.value += 1
+
+            return pid
+
         with self.id_lock:
             pid = self._next_id
 
@@ -79,6 +129,10 @@ class Node(object):
             for scheduler in self.schedulers:
                 scheduler.start()
 
+            if self.sample_file is not None:
+                self.sampler = mania.profile.Sampler(self)
+                self.sampler.start()
+
             self.init_modules()
 
             self.started.acquire()
@@ -96,15 +150,30 @@ class Node(object):
 
             logger.info('Node stopped')
 
+            if self.profile is not None:
+                self.profile.report()
+
+            if self.sampler is not None:
+                self.sampler.stop()
+                self.sampler.dump(self.sample_file)
+
+                self.sampler = None
+
     def stop(self):
         for scheduler in self.schedulers:
-            scheduler.stopping.acquire()
+            scheduler.stop()
 
     def init_schedulers(self):
         self.schedulers = []
 
         for i in xrange(self.scheduler_count):
-            self.schedulers.append(Scheduler(self, self.tick_limit))
+            if self.backend == PROCESS_BACKEND:
+                scheduler = RemoteScheduler(self, self.tick_limit, i)
+
+            else:
+                scheduler = Scheduler(self, self.tick_limit)
+
+            self.schedulers.append(scheduler)
 
     def init_modules(self):
         builtins = pkgutil.iter_modules(
@@ -123,6 +192,9 @@ class Node(object):
 
                     self.loaded_modules[library.name] = library
 
+                    if self.profile is not None:
+                        self.profile.name_scope(library.scope)
+
         boot = self.loaded_modules[mania.types.Symbol('mania:boot')]
 
         for path in self.paths:
@@ -131,23 +203,109 @@ class Node(object):
                     if os.path.splitext(filename)[1] != '.bam':
                         continue
 
-                    with open(os.path.join(root, filename), 'rb') as stream:
-                        module = Module.load(stream)
+                    module = mania.types.LazyModule.map(os.path.join(root, filename))
 
-                        self.spawn_process(
-                            module.code(module.entry_point),
-                            Scope(parent=boot.scope)
-                        )
+                    self.spawn_process(
+                        module.code(module.entry_point),
+                        Scope(parent=boot.scope)
+                    )
 
     def run(self):
-        while any(s.alive and (s.processes or s.new_processes) for s in self.schedulers):
-            for scheduler in self.schedulers:
-                if scheduler.alive:
-                    scheduler.join(0.1)
+        if self.backend == PROCESS_BACKEND:
+            return self.run_remote()
+
+        with self.idle:
+            while self.process_count > 0:
+                self.idle.wait()
+
+    def run_remote(self):
+        while self.process_count > 0:
+            message = self.control.get()
+            kind, index = message[:2]
+            scheduler = self.schedulers[index]
+
+            if kind == 'spawned':
+                with self.idle:
+                    self.process_count += 1
+
+                scheduler.registered_processes[message[2]] = None
+
+            elif kind == 'exited':
+                scheduler.registered_processes.pop(message[2], None)
+
+                self.process_exited(None)
+
+            elif kind == 'send':
+                self.send(message[2], mania.types.loads(message[3]))
+
+            elif kind == 'register':
+                Node.register_module(
+                    self,
+                    mania.types.loads(message[2]),
+                    mania.types.Module.loads(message[3])
+                )
+
+                for other in self.schedulers:
+                    if other is not scheduler:
+                        other.inbox.put(message)
+
+            elif kind == 'publish':
+                name = mania.types.loads(message[2])
+
+                with self.load_lock:
+                    known = name in self.registered_modules
+
+                if not known:
+                    Node.register_module(
+                        self,
+                        name,
+                        mania.types.Module.loads(message[3])
+                    )
+
+                    for other in self.schedulers:
+                        if other is not scheduler:
+                            other.inbox.put(('register',) + message[1:])
+
+            elif kind == 'import':
+                name = mania.types.loads(message[2])
+
+                with self.load_lock:
+                    module = (
+                        self.registered_modules.get(name) or
+                        self.loading_modules.get(name)
+                    )
+
+                if module is None:
+                    scheduler.inbox.put(('missing', message[2]))
+
+                else:
+                    scheduler.inbox.put((
+                        'register',
+                        None,
+                        message[2],
+                        scheduler.encode(module)
+                    ))
+
+    def process_exited(self, process):
+        with self.idle:
+            self.process_count -= 1
+
+            if self.process_count <= 0:
+                self.idle.notify_all()
 
     def spawn_process(self, code, scope=None):
         with self.spawn_lock:
-            process = Process(None, self.next_pid, code, scope)
+            process = Process(
+                None,
+                self.next_pid,
+                code,
+                scope,
+                self.engine,
+                self.profile
+            )
+
+            with self.idle:
+                self.process_count += 1
 
             try:
                 if self.started.acquire(False):
@@ -175,6 +333,13 @@ class Node(object):
         scheduler.spawn_process(process)
 
     def kill_process(self, pid):
+        process = self.processes.get(pid)
+
+        if process is not None:
+            process.scheduler.kill(process)
+
+            return
+
         for scheduler in self.schedulers:
             try:
                 scheduler.kill_process(pid)
@@ -182,39 +347,131 @@ class Node(object):
             except KeyError:
                 pass
 
+    def send(self, pid, message):
+        process = self.processes.get(pid)
+
+        if process is not None:
+            process.send(message)
+
+            return
+
+        for scheduler in self.schedulers:
+            if pid in scheduler.registered_processes:
+                scheduler.send(pid, message)
+
+                return
+
     def load_module(self, name):
         with self.load_lock:
             if name in self.loaded_modules:
-                if name in self.registered_modules:
-                    del self.registered_modules[name]
-
                 return self.loaded_modules[name]
 
-            elif name in self.registered_modules:
-                module = self.registered_modules[name]
-                default = self.loaded_modules[mania.types.Symbol('mania')]
+            elif name in self.loading_modules:
+                raise LoadingDeferred()
 
-                self.spawn_process(
-                    code=module.code(module.entry_point),
-                    scope=Scope(parent=default.scope)
-                )
+            elif name not in self.registered_modules:
+                raise ImportError('Module {0!r} not found'.format(name.value))
 
-                raise LoadingDeferred()
+            module = self.loading_modules[name] = (
+                self.registered_modules.pop(name)
+            )
+            default = self.loaded_modules[mania.types.Symbol('mania')]
+
+        self.spawn_process(
+            code=module.code(module.entry_point),
+            scope=Scope(parent=default.scope)
+        )
+
+        raise LoadingDeferred()
+
+    def register_module(self, name, module):
+        mania.frame.invalidate()
+
+        with self.load_lock:
+            self.registered_modules[name] = module
+
+    def publish_module(self, name, module, source=None):
+        mania.frame.invalidate()
+
+        with self.load_lock:
+            self.loaded_modules[name] = module
+            self.loading_modules.pop(name, None)
+            self.registered_modules.pop(name, None)
+
+            waiters = self.module_waiters.pop(name, ())
+
+        for process in waiters:
+            process.scheduler.wake_loaded(process)
+
+    def wait_for_module(self, process):
+        with self.load_lock:
+            if process.waiting_for in self.loaded_modules:
+                return False
+
+            self.module_waiters.setdefault(process.waiting_for, []).append(
+                process
+            )
+
+            return True
 
-            raise ImportError('Module {0!r} not found'.format(name.value))
+    def signal_idle(self, busy):
+        for scheduler in self.schedulers:
+            if scheduler is not busy and scheduler.sleeping:
+                with scheduler.condition:
+                    scheduler.condition.notify()
+
+                return
+
+
+class RunQueue(object):
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        self.floor = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, process):
+        if process.priority < self.floor:
+            process.priority = self.floor
+
+        heapq.heappush(self.heap, (process.priority, next(self.counter), process))
+
+    def pop(self):
+        priority, _, process = heapq.heappop(self.heap)
+
+        self.floor = priority
+
+        return process
+
+    def steal(self):
+        if len(self.heap) < 2 or self.heap[-1][2].affinity > 0:
+            return None
+
+        _, _, process = self.heap.pop()
+
+        return process
 
 
 class Scheduler(object):
 
-    def __init__(self, node, tick_limit):
+    def __init__(self, node, tick_limit, affinity=DEFAULT_STEAL_AFFINITY):
         self.node = node
         self.tick_limit = tick_limit
+        self.affinity = affinity
         self.thread = threading.Thread(target=self.run)
-        self.processes = []
-        self.new_processes = []
+        self.running = True
+        self.sleeping = False
+        self.current = None
+        self.steals = 0
+        self.stolen = 0
+        self.run_queue = RunQueue()
+        self.waiting = set()
+        self.loading = set()
         self.registered_processes = {}
-        self.stopping = threading.Lock()
-        self.spawn_lock = threading.Lock()
+        self.condition = threading.Condition()
 
     @property
     def next_pid(self):
@@ -230,165 +487,631 @@ class Scheduler(object):
     def start(self):
         self.thread.start()
 
+    def stop(self):
+        with self.condition:
+            self.running = False
+
+            self.condition.notify_all()
+
     def run(self):
-        while self.stopping.acquire(False):
-            self.stopping.release()
+        while self.running:
+            process = self.next_process()
 
-            with self.spawn_lock:
-                scheduled_processes = self.processes + self.new_processes
-                self.new_processes = []
+            if process is None:
+                continue
 
-            self.processes = []
+            self.run_process(process)
 
-            for process in scheduled_processes:
-                if process.status == RUNNING:
-                    self.processes.append(process)
+            with self.condition:
+                self.reschedule(process)
 
-                    try:
-                        ticks = process.run(self.tick_limit)
+                busy = len(self.run_queue) > 1
+
+            if busy:
+                self.node.signal_idle(self)
+
+    def next_process(self):
+        with self.condition:
+            if self.run_queue:
+                return self.run_queue.pop()
+
+        process = self.steal()
+
+        if process is not None:
+            return process
+
+        with self.condition:
+            if self.running and not self.run_queue:
+                self.sleeping = True
+
+                self.condition.wait()
+
+                self.sleeping = False
+
+    def steal(self):
+        victims = sorted(
+            self.node.schedulers,
+            key=lambda scheduler: len(scheduler.run_queue),
+            reverse=True
+        )
+
+        for victim in victims:
+            if victim is self or len(victim.run_queue) < 2:
+                continue
+
+            with victim.condition:
+                process = victim.run_queue.steal()
+
+                if process is None:
+                    continue
+
+                victim.registered_processes.pop(process.id, None)
+                victim.stolen += 1
+
+            with self.condition:
+                process.scheduler = self
+                process.affinity = self.affinity
+
+                self.registered_processes[process.id] = process
+                self.steals += 1
+
+            return process
+
+    def run_process(self, process):
+        if process.affinity > 0:
+            process.affinity -= 1
+
+        if process.status != RUNNING:
+            return
+
+        self.current = process
+
+        try:
+            ticks = process.run(self.tick_limit)
+
+            process.priority += (self.tick_limit - ticks) / self.tick_limit
+
+        except Exception as exception:
+            ex_type, _, trace = sys.exc_info()
+
+            process.status = EXITING
+
+            logger.info('Process {0} stopped with unhandled exception {1} {2}'.format(
+                process.id,
+                exception,
+                ''.join(traceback.format_tb(trace))
+            ))
+
+        finally:
+            self.current = None
+
+    def reschedule(self, process):
+        if process.kill_status is not None:
+            process.status = EXITING
 
-                        process.priority += ticks / self.tick_limit
+        if process.status == RUNNING:
+            self.run_queue.push(process)
 
-                    except Exception as exception:
-                        ex_type, _, trace = sys.exc_info()
+        elif process.status == WAITING_FOR_MESSAGE:
+            if not process.mailbox.pending():
+                self.waiting.add(process)
 
-                        process.status = EXITING
+            else:
+                self.resume(process)
+
+        elif process.status == WAITING_FOR_MODULE:
+            if self.node.wait_for_module(process):
+                self.loading.add(process)
+
+            else:
+                self.resume(process)
+
+        elif process.status == EXITING:
+            if process.id in self.registered_processes:
+                del self.registered_processes[process.id]
 
-                        logger.info('Process {0} stopped with unhandled exception {1} {2}'.format(
-                            process.id,
-                            exception,
-                            ''.join(traceback.format_tb(trace))
-                        ))
+            self.node.processes.pop(process.id, None)
 
-                elif process.status == WAITING_FOR_MESSAGE:
-                    self.processes.append(process)
+            logger.info('Process {0} stopped'.format(process.id))
 
-                    if not process.queue.empty():
-                        process.status = RUNNING
+            self.node.process_exited(process)
 
-                elif process.status == WAITING_FOR_MODULE:
-                    self.processes.append(process)
+    def resume(self, process):
+        if process.status in (WAITING_FOR_MESSAGE, WAITING_FOR_MODULE):
+            process.status = RUNNING
 
-                    if process.waiting_for in self.node.loaded_modules:
-                        process.status = RUNNING
+        self.run_queue.push(process)
 
-                elif process.status == EXITING:
-                    if process.id in self.registered_processes:
-                        del self.registered_processes[process.id]
+        self.condition.notify()
 
-                    logger.info('Process {0} stopped'.format(process.id))
+    def wake(self, process):
+        with self.condition:
+            if process in self.waiting:
+                self.waiting.remove(process)
 
-            self.processes.sort(key=operator.attrgetter('priority'))
+                self.resume(process)
+
+    def wake_loaded(self, process):
+        with self.condition:
+            if process in self.loading:
+                self.loading.remove(process)
+
+                self.resume(process)
 
     def spawn_process(self, process):
-        with self.spawn_lock:
+        with self.condition:
             process.scheduler = self
 
             self.registered_processes[process.id] = process
+            self.node.processes[process.id] = process
+
+            self.run_queue.push(process)
+
+            self.condition.notify()
+
+        return process
+
+    def send(self, pid, message):
+        self.registered_processes[pid].send(message)
+
+    def kill_process(self, pid):
+        self.kill(self.registered_processes[pid])
+
+    def kill(self, process):
+        process.kill()
+
+        with self.condition:
+            if process in self.waiting or process in self.loading:
+                self.waiting.discard(process)
+                self.loading.discard(process)
+
+                self.resume(process)
+
+
+class RemoteScheduler(object):
 
-            self.new_processes.append(process)
+    def __init__(self, node, tick_limit, index):
+        self.node = node
+        self.tick_limit = tick_limit
+        self.index = index
+        self.inbox = multiprocessing.Queue()
+        self.registered_processes = {}
+        self.encoded = weakref.WeakKeyDictionary()
+        self.process = multiprocessing.Process(
+            target=run_worker,
+            args=(
+                index,
+                tick_limit,
+                node.engine,
+                node.shared_id,
+                self.inbox,
+                node.control,
+                node.profile is not None
+            )
+        )
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def join(self, timeout):
+        self.process.join(timeout)
+
+    def start(self):
+        self.process.start()
+
+    def stop(self):
+        if self.process.is_alive():
+            self.inbox.put(('stop',))
+
+            self.process.join()
+
+    def encode(self, module):
+        try:
+            return self.encoded[module]
+
+        except KeyError:
+            data = self.encoded[module] = module.dumps()
+
+            return data
+
+    def spawn_process(self, process):
+        code = process.vm.frame.code
+        scope = process.vm.frame.scope
+
+        if scope.locals or scope.parent is None or scope.parent.module is None:
+            raise ValueError(
+                'Process {0} can only be placed on a remote scheduler with a '
+                'fresh scope over a native module'.format(process.id)
+            )
+
+        self.registered_processes[process.id] = process
+
+        self.inbox.put((
+            'spawn',
+            process.id,
+            self.encode(code.module),
+            code.entry_point,
+            code.size,
+            mania.types.dumps(scope.parent.module.name)
+        ))
 
         return process
 
+    def send(self, pid, message):
+        self.inbox.put(('send', pid, mania.types.dumps(message)))
+
     def kill_process(self, pid):
-        self.registered_processes[pid].kill()
+        if pid not in self.registered_processes:
+            raise KeyError(pid)
+
+        self.inbox.put(('kill', pid))
+
+
+class WorkerNode(Node):
+
+    def __init__(self, index, tick_limit, engine, shared_id, control,
+                 profile=False):
+        Node.__init__(self, tick_limit, 1, [], engine, profile=profile)
+
+        self.index = index
+        self.shared_id = shared_id
+        self.control = control
+        self.modules = {}
+        self.requested_modules = set()
+        self.missing_modules = set()
+
+    def spawn_process(self, code, scope=None):
+        process = Process(
+            None,
+            self.next_pid,
+            code,
+            scope,
+            self.engine,
+            self.profile
+        )
+
+        self.control.put(('spawned', self.index, process.id))
+
+        self._spawn_process(process)
+
+        return process
+
+    def process_exited(self, process):
+        self.control.put(('exited', self.index, process.id))
+
+    def send(self, pid, message):
+        process = self.processes.get(pid)
+
+        if process is not None:
+            process.send(message)
+
+        else:
+            self.control.put((
+                'send',
+                self.index,
+                pid,
+                mania.types.dumps(message)
+            ))
+
+    def register_module(self, name, module):
+        Node.register_module(self, name, module)
+
+        try:
+            data = module.dumps()
+
+        except AttributeError:
+            logger.info('Module {0} cannot leave scheduler {1}'.format(
+                name,
+                self.index
+            ))
+
+            return
+
+        self.control.put((
+            'register',
+            self.index,
+            mania.types.dumps(name),
+            data
+        ))
+
+    def publish_module(self, name, module, source=None):
+        Node.publish_module(self, name, module)
+
+        try:
+            data = source.dumps()
+
+        except AttributeError:
+            logger.info('Module {0} cannot leave scheduler {1}'.format(
+                name,
+                self.index
+            ))
+
+            return
+
+        self.control.put((
+            'publish',
+            self.index,
+            mania.types.dumps(name),
+            data
+        ))
+
+    def load_module(self, name):
+        try:
+            return Node.load_module(self, name)
+
+        except ImportError:
+            with self.load_lock:
+                if name in self.missing_modules:
+                    raise
+
+                if name in self.requested_modules:
+                    raise LoadingDeferred()
+
+                self.requested_modules.add(name)
+
+            self.control.put(('import', self.index, mania.types.dumps(name)))
+
+            raise LoadingDeferred()
+
+    def wait_for_module(self, process):
+        name = process.waiting_for
+
+        with self.load_lock:
+            if (name not in self.loading_modules and
+                    name not in self.requested_modules):
+                return False
+
+            self.module_waiters.setdefault(name, []).append(process)
+
+            return True
+
+    def receive_module(self, name, module):
+        Node.register_module(self, name, module)
+
+        with self.load_lock:
+            self.requested_modules.discard(name)
+            self.missing_modules.discard(name)
+
+            waiters = self.module_waiters.pop(name, ())
+
+        for process in waiters:
+            process.scheduler.wake_loaded(process)
+
+    def miss_module(self, name):
+        with self.load_lock:
+            self.requested_modules.discard(name)
+            self.missing_modules.add(name)
+
+            waiters = self.module_waiters.pop(name, ())
+
+        for process in waiters:
+            process.scheduler.wake_loaded(process)
+
+    def decode(self, data):
+        try:
+            return self.modules[data]
+
+        except KeyError:
+            module = self.modules[data] = mania.types.Module.loads(data)
+
+            return module
+
+    def serve(self, inbox):
+        self.init_schedulers()
+
+        for scheduler in self.schedulers:
+            scheduler.start()
+
+        self.init_modules()
+
+        try:
+            while True:
+                message = inbox.get()
+                kind = message[0]
+
+                if kind == 'stop':
+                    break
+
+                elif kind == 'spawn':
+                    _, pid, data, entry_point, size, name = message
+                    module = self.decode(data)
+                    parent = self.loaded_modules[mania.types.loads(name)]
+
+                    self._spawn_process(Process(
+                        None,
+                        pid,
+                        mania.types.Code(module, entry_point, size),
+                        Scope(parent=parent.scope),
+                        self.engine,
+                        self.profile
+                    ))
+
+                elif kind == 'send':
+                    try:
+                        self.schedulers[0].send(
+                            message[1],
+                            mania.types.loads(message[2])
+                        )
+
+                    except KeyError:
+                        pass
+
+                elif kind == 'register':
+                    self.receive_module(
+                        mania.types.loads(message[2]),
+                        mania.types.Module.loads(message[3])
+                    )
+
+                elif kind == 'missing':
+                    self.miss_module(mania.types.loads(message[1]))
+
+                elif kind == 'kill':
+                    self.kill_process(message[1])
+
+        finally:
+            self.stop()
+
+            if self.profile is not None:
+                self.profile.report()
+
+
+def run_worker(index, tick_limit, engine, shared_id, inbox, control,
+               profile=False):
+    WorkerNode(
+        index,
+        tick_limit,
+        engine,
+        shared_id,
+        control,
+        profile
+    ).serve(inbox)
+
+
+class Mailbox(object):
+
+    __slots__ = ('messages', 'pattern', 'position')
+
+    def __init__(self):
+        self.messages = collections.deque()
+        self.pattern = None
+        self.position = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def put(self, message):
+        self.messages.append(message)
+
+    def pending(self):
+        if self.pattern is None:
+            return bool(self.messages)
+
+        return len(self.messages) > self.position
+
+    def receive(self, pattern=None):
+        messages = self.messages
+
+        if pattern is None:
+            self.pattern = None
+
+            if messages:
+                return messages.popleft()
+
+            return None
+
+        if pattern is not self.pattern:
+            self.pattern = pattern
+            self.position = 0
+
+        for i in xrange(self.position, len(messages)):
+            message = messages[i]
+
+            if pattern.test(message) is not None:
+                del messages[i]
+
+                self.position = i
+
+                return message
+
+        self.position = len(messages)
+
+        return None
 
 
 class Process(object):
 
-    def __init__(self, scheduler, id, code, scope):
+    __slots__ = (
+        'scheduler', 'id', 'priority', 'affinity', 'status', 'kill_status',
+        '_mailbox', 'waiting_for', 'vm'
+    )
+
+    mailbox_lock = threading.Lock()
+
+    def __init__(self, scheduler, id, code, scope, engine=DEFAULT_ENGINE,
+                 profile=None):
         self.scheduler = scheduler
         self.id = id
         self.priority = 0
+        self.affinity = 0
         self.status = RUNNING
         self.kill_status = None
-        self.queue = queue.Queue()
+        self._mailbox = None
         self.waiting_for = None
-        self.vm = VM(self, code, scope)
-        self.status_lock = threading.Lock()
-        self.kill_lock = threading.Lock()
+        self.vm = VM(self, code, scope, engine, profile)
 
-    def kill(self):
-        try:
-            if self.status_lock.acquire(False):
-                release = True
+    @property
+    def mailbox(self):
+        if self._mailbox is None:
+            with self.mailbox_lock:
+                if self._mailbox is None:
+                    self._mailbox = Mailbox()
 
-                self.status = EXITING
+        return self._mailbox
 
-            else:
-                release = False
+    def kill(self):
+        self.kill_status = EXITING
 
-                with self.kill_lock:
-                    self.kill_status = EXITING
+    def send(self, message):
+        self.mailbox.put(message)
 
-        finally:
-            if release:
-                self.status_lock.release()
+        if self.scheduler is not None:
+            self.scheduler.wake(self)
 
     def run(self, ticks):
-        with self.status_lock:
-            if self.status == RUNNING:
-                ticks = self.vm.run(ticks)
+        if self.status == RUNNING and self.kill_status is None:
+            ticks = self.vm.run(ticks)
 
-            if self.kill_status is not None:
-                self.status = EXITING
+        if self.kill_status is not None:
+            self.status = EXITING
 
-            return ticks
+        return ticks
 
 
 class VM(object):
 
-    def __init__(self, process, code, scope):
+    __slots__ = ('process', 'frame', 'engine', 'switches', 'profile')
+
+    def __init__(self, process, code, scope, engine=DEFAULT_ENGINE,
+                 profile=None):
         self.process = process
         self.frame = Frame(code=code, scope=scope)
+        self.engine = engine
         self.switches = 0
+        self.profile = profile
 
     def tick(self):
-        instruction = self.frame.code[self.frame.position]
-
-        self.frame.position += 1
-
         frame = self.frame
+        instructions = frame.code.module.instructions
+        position = frame.position
 
-        instruction.eval(self)
-
-        limit = self.frame.code.entry_point + self.frame.code.size
-
-        if self.frame.position >= limit:
-            self.switches += 1
-
-            self.restore()
-
-            return
+        frame.position += 1
 
-        if self.frame is not frame:
-            self.switches += 1
+        mania.instructions.handlers[instructions.opcodes[position]](
+            self,
+            instructions.arguments[position]
+        )
 
-            last = self.frame.code[limit - 1]
+        self.unwind()
 
-            if frame.position < frame.code.entry_point + frame.code.size:
-                next = frame.code[frame.position]
+    def unwind(self):
+        frame = self.frame
 
-                if isinstance(next, mania.instructions.Return):
-                    if isinstance(last, mania.instructions.Return):
-                        self.frame.parent = frame.parent
+        while frame.position >= frame.code.entry_point + frame.code.size:
+            self.restore()
 
-                    elif isinstance(last, mania.instructions.Restore):
-                        for i in xrange(self.frame.code.entry_point, limit):
-                            instruction = self.frame.code[i]
+            frame = self.frame
 
-                            if isinstance(instruction, mania.instructions.Restore):
-                                self.frame.code[i] = next
+    def run(self, ticks):
+        if self.profile is not None:
+            return self.run_profiled(ticks)
 
-                elif isinstance(next, mania.instructions.Restore):
-                    if isinstance(last, mania.instructions.Restore):
-                        self.frame.parent = frame.parent
+        elif self.engine == FAST_ENGINE:
+            return self.run_fast(ticks)
 
-            else:
-                if not isinstance(last, mania.instructions.Return):
-                    self.frame.parent = frame.parent
+        return self.run_ticks(ticks)
 
-    def run(self, ticks):
+    def run_ticks(self, ticks):
         for tick in xrange(ticks):
             try:
                 self.tick()
@@ -403,6 +1126,137 @@ class VM(object):
 
         return ticks - (tick + 1)
 
+    def run_profiled(self, ticks):
+        profile = self.profile
+        timer = profile.timer
+        types = mania.instructions.opcodes
+        Function = mania.types.Function
+        Macro = mania.types.Macro
+        opcodes = collections.Counter()
+        instructions = collections.Counter()
+        times = collections.Counter()
+        code = self.frame.code
+        start = timer()
+        tick = 0
+
+        try:
+            while tick < ticks:
+                frame = self.frame
+                bytecode = frame.code.module.instructions
+                opcode = bytecode.opcodes[frame.position]
+                argument = bytecode.arguments[frame.position]
+                tick += 1
+
+                opcodes[types[opcode]] += 1
+                instructions[frame.code] += 1
+
+                if opcode == STORE:
+                    value = frame.stack.peek()
+
+                    if isinstance(value, (Function, Macro)):
+                        profile.name_value(value, frame.constant(argument))
+
+                elif opcode == STORE_LOCAL and frame.scope.layout is not None:
+                    value = frame.stack.peek()
+
+                    if isinstance(value, (Function, Macro)):
+                        profile.name_value(
+                            value,
+                            frame.scope.layout.names[argument]
+                        )
+
+                try:
+                    self.tick()
+
+                finally:
+                    if self.frame.code is not code:
+                        now = timer()
+                        times[code] += now - start
+                        code = self.frame.code
+                        start = now
+
+        except Schedule:
+            logger.info('schedule at tick {0}/{1}'.format(tick, ticks))
+
+        finally:
+            times[code] += timer() - start
+
+            profile.merge(opcodes, instructions, times)
+
+        return ticks - tick
+
+    def run_fast(self, ticks):
+        handlers = mania.instructions.handlers
+        Pair = mania.types.Pair
+        false = mania.types.Bool(False)
+        tick = 0
+
+        try:
+            while tick < ticks:
+                frame = self.frame
+                code = frame.code
+                module = code.module
+                opcodes = module.instructions.opcodes
+                arguments = module.instructions.arguments
+                constants = module.constants
+                limit = code.entry_point + code.size
+                stack = frame.stack
+                position = frame.position
+
+                while tick < ticks:
+                    opcode = opcodes[position]
+                    argument = arguments[position]
+                    position += 1
+                    tick += 1
+
+                    if opcode == LOAD_CONSTANT:
+                        stack.append(constants[argument])
+
+                    elif opcode == LOAD_LOCAL:
+                        stack.append(frame.scope.slots[argument])
+
+                    elif opcode == STORE_LOCAL:
+                        frame.scope.slots[argument] = stack.pop()
+
+                    elif opcode == BUILD_PAIR:
+                        tail = stack.pop()
+
+                        stack.append(Pair(stack.pop(), tail))
+
+                    elif opcode == JUMP:
+                        position = argument
+
+                    elif opcode == JUMP_IF_FALSE:
+                        if stack.pop() == false:
+                            position = argument
+
+                    else:
+                        frame.position = position
+
+                        handlers[opcode](self, argument)
+
+                        if self.frame is not frame or frame.code is not code:
+                            self.unwind()
+
+                            break
+
+                        position = frame.position
+
+                    if position >= limit:
+                        frame.position = position
+
+                        self.unwind()
+
+                        break
+
+                else:
+                    frame.position = position
+
+        except Schedule:
+            logger.info('schedule at tick {0}/{1}'.format(tick, ticks))
+
+        return ticks - tick
+
     def restore(self, frame=None):
         if frame is None:
             frame = self.frame.parent
@@ -410,6 +1264,8 @@ class VM(object):
         if frame:
             self.frame = frame
 
+            self.switches += 1
+
         else:
             self.process.kill()
 
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+'''
+   mania.profile
+   ~~~~~~~~~~~~~
+
+   :copyright: (c) 2015 by Björn Schulz.
+   :license: MIT, see LICENSE for more details.
+'''
+
+from __future__ import absolute_import, division
+import sys
+import time
+import logging
+import collections
+import threading
+import weakref
+import mania.types
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_REPORT_LIMIT = 20
+DEFAULT_SAMPLE_INTERVAL = 0.01
+DEFAULT_SAMPLE_DEPTH = 128
+
+
+def module_name(module):
+    if isinstance(module.name, mania.types.Symbol) and module.name.value:
+        return module.name.value
+
+    return u'anonymous'
+
+
+class Profile(object):
+
+    '''
+    Counters collected by a :class:`mania.node.VM` running in profiling
+    mode. Schedulers merge the counters of a time slice at its end, macro
+    expansions and call compilations are recorded as they happen.
+    '''
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self.lock = threading.Lock()
+        self.opcodes = collections.Counter()
+        self.instructions = collections.Counter()
+        self.times = collections.Counter()
+        self.macros = collections.Counter()
+        self.names = weakref.WeakKeyDictionary()
+        self.frames = weakref.WeakKeyDictionary()
+        self.calls = 0
+
+    def merge(self, opcodes, instructions, times):
+        with self.lock:
+            self.opcodes.update(opcodes)
+
+            for code, count in instructions.iteritems():
+                self.instructions[self.name(code)] += count
+
+            for code, elapsed in times.iteritems():
+                self.times[self.name(code)] += elapsed
+
+    def name_value(self, value, name):
+        if isinstance(value, mania.types.NativeFunction):
+            return
+
+        elif isinstance(value, mania.types.Function):
+            self.names.setdefault(value.code, name)
+
+        elif isinstance(value, mania.types.Macro):
+            self.names.setdefault(value, name)
+
+    def name_scope(self, scope):
+        for name, value in (scope.locals or {}).iteritems():
+            self.name_value(value, name)
+
+    def name_frame(self, code, kind, owner):
+        self.frames.setdefault(code, (kind, owner))
+
+    def expand_macro(self, macro, name=None):
+        with self.lock:
+            self.macros[macro] += 1
+
+        if isinstance(name, mania.types.Symbol):
+            self.names.setdefault(macro, name)
+
+    def compile_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def name(self, code):
+        name = self.names.get(code)
+
+        if name is not None:
+            return name.value
+
+        frame = self.frames.get(code)
+
+        if frame is not None:
+            kind, owner = frame
+
+            return u'{0} ({1})'.format(self.owner_name(owner), kind)
+
+        return u'{0}@{1}'.format(module_name(code.module), code.entry_point)
+
+    def owner_name(self, owner):
+        if isinstance(owner, mania.types.Macro):
+            return self.macro_name(owner)
+
+        elif isinstance(owner, mania.types.Symbol):
+            return owner.value
+
+        elif isinstance(owner, mania.types.Local):
+            return owner.name.value
+
+        return owner.to_string().value
+
+    def macro_name(self, macro):
+        name = self.names.get(macro)
+
+        if name is not None:
+            return name.value
+
+        return macro.to_string().value
+
+    def stats(self):
+        with self.lock:
+            functions = collections.defaultdict(lambda: [0, 0.0])
+            macros = collections.Counter()
+
+            for name, count in self.instructions.iteritems():
+                functions[name][0] += count
+
+            for name, elapsed in self.times.iteritems():
+                functions[name][1] += elapsed
+
+            for macro, count in self.macros.iteritems():
+                macros[self.macro_name(macro)] += count
+
+            return {
+                'opcodes': dict(
+                    (cls.__name__, count)
+                    for cls, count in self.opcodes.iteritems()
+                ),
+                'functions': dict(
+                    (name, tuple(values))
+                    for name, values in functions.iteritems()
+                ),
+                'macros': dict(macros),
+                'calls': self.calls
+            }
+
+    def report(self, stream=None, limit=DEFAULT_REPORT_LIMIT):
+        if stream is None:
+            stream = sys.stderr
+
+        stats = self.stats()
+
+        stream.write('{0:<40} {1:>12}\n'.format('opcode', 'count'))
+
+        for name, count in sorted(
+            stats['opcodes'].iteritems(),
+            key=lambda item: item[1],
+            reverse=True
+        )[:limit]:
+            stream.write('{0:<40} {1:>12}\n'.format(name, count))
+
+        stream.write('\n{0:<40} {1:>12} {2:>12}\n'.format(
+            'function',
+            'count',
+            'seconds'
+        ))
+
+        for name, (count, elapsed) in sorted(
+            stats['functions'].iteritems(),
+            key=lambda item: item[1][1],
+            reverse=True
+        )[:limit]:
+            stream.write(u'{0:<40} {1:>12} {2:>12.6f}\n'.format(
+                name,
+                count,
+                elapsed
+            ).encode('utf-8'))
+
+        stream.write('\n{0:<40} {1:>12}\n'.format('macro', 'expansions'))
+
+        for name, count in sorted(
+            stats['macros'].iteritems(),
+            key=lambda item: item[1],
+            reverse=True
+        )[:limit]:
+            stream.write(u'{0:<40} {1:>12}\n'.format(
+                name,
+                count
+            ).encode('utf-8'))
+
+        stream.write('\n{0:<40} {1:>12}\n'.format(
+            'compiled calls',
+            stats['calls']
+        ))
+
+
+class Sampler(object):
+
+    '''
+    Periodically walks the frame chain of the process every scheduler of
+    a node is running and counts the collapsed stacks, in the format
+    read by flamegraph tools.
+    '''
+
+    def __init__(self, node, interval=DEFAULT_SAMPLE_INTERVAL,
+                 depth=DEFAULT_SAMPLE_DEPTH):
+        self.node = node
+        self.interval = interval
+        self.depth = depth
+        self.stacks = collections.Counter()
+        self.names = weakref.WeakKeyDictionary()
+        self.samples = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+        if self.thread is not None:
+            self.thread.join()
+
+            self.thread = None
+
+    def run(self):
+        while self.running:
+            time.sleep(self.interval)
+
+            self.sample()
+
+    def sample(self):
+        for scheduler in self.node.schedulers:
+            process = getattr(scheduler, 'current', None)
+
+            if process is None:
+                continue
+
+            frame = process.vm.frame
+            stack = []
+
+            while frame is not None and len(stack) < self.depth:
+                stack.append(self.name(frame.code, frame.scope))
+
+                frame = frame.parent
+
+            if frame is not None:
+                stack.append(u'[truncated]')
+
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def name(self, code, scope):
+        name = self.names.get(code)
+
+        if name is not None:
+            return name
+
+        profile = self.node.profile
+
+        while scope is not None and name is None:
+            name = self.find(code, scope)
+            scope = scope.parent
+
+        if name is None and profile is not None and code in profile.frames:
+            name = profile.name(code)
+
+        elif name is None:
+            name = u'{0}@{1}'.format(module_name(code.module), code.entry_point)
+
+        self.names[code] = name
+
+        return name
+
+    def find(self, code, scope):
+        values = (scope.locals or {}).items()
+
+        if scope.layout is not None:
+            values.extend(zip(scope.layout.names, scope.slots))
+
+        for symbol, value in values:
+            if (
+                isinstance(value, mania.types.Function) and
+                not isinstance(value, mania.types.NativeFunction) and
+                value.code == code
+            ):
+                return symbol.value
+
+    def write(self, stream):
+        for stack, count in sorted(self.stacks.iteritems()):
+            stream.write(u'{0} {1}\n'.format(
+                u';'.join(stack),
+                count
+            ).encode('utf-8'))
+
+    def dump(self, filename):
+        with open(filename, 'wb') as stream:
+            self.write(stream)
@@ -11,30 +11,175 @@
 from __future__ import absolute_import
 import logging
 import io
+import sys
+import mmap
+import array
 import struct
+import threading
+import itertools
 import collections
 import types
+import zlib
 import mania.consts as consts
 import mania.instructions
 import mania.compiler
 import mania.frame
+import mania.utils
 
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_EXPANSION_CACHE_SIZE = 1024
+
+
+column_types = {1: 'B', 2: 'H', 4: 'I'}
+
+
 serializable_types = {}
+serializable_codes = {}
 
 
 def serializable(type):
     def _inner(cls):
         serializable_types[type] = cls
+        serializable_codes[cls] = type
 
         return cls
 
     return _inner
 
 
+def dumps(value):
+    stream = io.BytesIO()
+
+    value.dump(stream)
+
+    return stream.getvalue()
+
+
+def loads(data):
+    value, _ = decode(data, 0)
+
+    return value
+
+
+def load(stream):
+    (type,) = struct.unpack('<B', stream.read(struct.calcsize('<B')))
+
+    return serializable_types[type].load(stream)
+
+
+def decode(data, offset):
+    return serializable_types[ord(data[offset])].decode(data, offset + 1)
+
+
+def is_serializable(value):
+    while True:
+        if isinstance(value, Pair):
+            if not is_serializable(value.head):
+                return False
+
+            value = value.tail
+
+        elif isinstance(value, (Quoted, Quasiquoted, Unquoted)):
+            value = value.value
+
+        else:
+            return type(value) in serializable_codes
+
+
+def encode_varint(value):
+    result = []
+
+    while value > 0x7f:
+        result.append(chr(0x80 | (value & 0x7f)))
+
+        value >>= 7
+
+    result.append(chr(value))
+
+    return ''.join(result)
+
+
+def decode_varint(data, offset):
+    byte = ord(data[offset])
+    offset += 1
+
+    if byte < 0x80:
+        return byte, offset
+
+    value = byte & 0x7f
+    shift = 7
+
+    while True:
+        byte = ord(data[offset])
+        offset += 1
+
+        value |= (byte & 0x7f) << shift
+
+        if byte < 0x80:
+            return value, offset
+
+        shift += 7
+
+
+def encode_signed(value):
+    return encode_varint(value << 1 if value >= 0 else ((-value) << 1) - 1)
+
+
+def decode_signed(data, offset):
+    value, offset = decode_varint(data, offset)
+
+    if value & 1:
+        return -((value + 1) >> 1), offset
+
+    return value >> 1, offset
+
+
+def encode_column(column):
+    top = max(column) if len(column) else 0
+
+    if not top:
+        return chr(0)
+
+    width = 1 if top < 0x100 else 2 if top < 0x10000 else 4
+    values = array.array(column_types[width], column)
+
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    return chr(width) + values.tostring()
+
+
+def decode_column(data, offset, count, typecode='i'):
+    width = ord(data[offset])
+    offset += 1
+
+    if not width:
+        return array.array(typecode, [0]) * count, offset
+
+    end = offset + width * count
+
+    if end > len(data):
+        raise FormatError('code column exceeds its section')
+
+    values = array.array(column_types[width])
+    values.fromstring(data[offset:end])
+
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    if values.typecode != typecode:
+        values = array.array(typecode, values)
+
+    return values, end
+
+
+class FormatError(Exception):
+    pass
+
+
 class MatchError(Exception):
     pass
 
@@ -58,6 +203,9 @@ class Ellipsis(Type):
     def __eq__(self, other):
         return isinstance(other, Ellipsis)
 
+    def __hash__(self):
+        return hash('ellipsis')
+
     def __nonzero__(self):
         return False
 
@@ -65,6 +213,10 @@ class Ellipsis(Type):
     def load(cls, stream):
         return cls()
 
+    @classmethod
+    def decode(cls, data, offset):
+        return cls(), offset
+
     def dump(self, stream):
         stream.write(struct.pack('<B', consts.ELLIPSIS))
 
@@ -81,6 +233,9 @@ class Undefined(Type):
     def __eq__(self, other):
         return isinstance(other, Undefined)
 
+    def __hash__(self):
+        return hash('undefined')
+
     def __nonzero__(self):
         return False
 
@@ -88,6 +243,10 @@ class Undefined(Type):
     def load(cls, stream):
         return cls()
 
+    @classmethod
+    def decode(cls, data, offset):
+        return cls(), offset
+
     def dump(self, stream):
         stream.write(struct.pack('<B', consts.UNDEFINED))
 
@@ -104,6 +263,9 @@ class Nil(Type):
     def __eq__(self, other):
         return isinstance(other, Nil)
 
+    def __hash__(self):
+        return hash('nil')
+
     def __nonzero__(self):
         return False
 
@@ -111,6 +273,10 @@ class Nil(Type):
     def load(cls, stream):
         return cls()
 
+    @classmethod
+    def decode(cls, data, offset):
+        return cls(), offset
+
     def dump(self, stream):
         stream.write(struct.pack('<B', consts.NIL))
 
@@ -130,6 +296,9 @@ class Bool(Type):
     def __eq__(self, other):
         return isinstance(other, Bool) and self.value == other.value
 
+    def __hash__(self):
+        return hash((u'bool', self.value))
+
     def __nonzero__(self):
         return self.value
 
@@ -137,6 +306,10 @@ class Bool(Type):
     def load(cls, stream):
         return cls(False if stream.read(1) == '\x00' else True)
 
+    @classmethod
+    def decode(cls, data, offset):
+        return cls(False if data[offset] == '\x00' else True), offset + 1
+
     def dump(self, stream):
         stream.write(struct.pack('<BB', consts.BOOLEAN, 1 if self.value else 0))
 
@@ -156,6 +329,9 @@ class Integer(Type):
     def __eq__(self, other):
         return isinstance(other, (Integer, Float)) and self.value == other.value
 
+    def __hash__(self):
+        return hash(self.value)
+
     def __gt__(self, other):
         return isinstance(other, (Integer, Float)) and self.value > other.value
 
@@ -171,6 +347,12 @@ class Integer(Type):
 
         return cls(int(''.join(value[:-1])))
 
+    @classmethod
+    def decode(cls, data, offset):
+        end = data.find('\x00', offset)
+
+        return cls(int(data[offset:end])), end + 1
+
     def dump(self, stream):
         stream.write(struct.pack('<B', consts.INTEGER))
         stream.write(str(self.value))
@@ -201,12 +383,17 @@ class Integer(Type):
 @serializable(consts.FLOAT)
 class Float(Type):
 
+    format = struct.Struct('<d')
+
     def __init__(self, value):
         self.value = value
 
     def __eq__(self, other):
         return isinstance(other, (Integer, Float)) and self.value == other.value
 
+    def __hash__(self):
+        return hash(self.value)
+
     def __gt__(self, other):
         return isinstance(other, (Integer, Float)) and self.value > other.value
 
@@ -219,6 +406,12 @@ class Float(Type):
         
         return cls(value)
 
+    @classmethod
+    def decode(cls, data, offset):
+        (value,) = cls.format.unpack_from(data, offset)
+
+        return cls(value), offset + cls.format.size
+
     def dump(self, stream):
         stream.write(struct.pack('<Bd', consts.FLOAT, self.value))
 
@@ -247,20 +440,39 @@ class Float(Type):
 @serializable(consts.SYMBOL)
 class Symbol(Type):
 
-    def __init__(self, value):
+    symbols = {}
+    parts = None
+
+    def __new__(cls, value):
+        try:
+            return cls.symbols[value]
+
+        except KeyError:
+            pass
+
         if isinstance(value, str):
             value = value.decode('utf-8')
 
-        self.value = value
+        symbol = Type.__new__(cls)
+        symbol.value = value
+        symbol.hash = hash(value)
+
+        return cls.symbols.setdefault(value, symbol)
+
+    def __reduce__(self):
+        return Symbol, (self.value,)
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.value == other.value
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
 
     def __nonzero__(self):
         return True
 
     def __hash__(self):
-        return hash(self.value)
+        return self.hash
 
     @classmethod
     def load(cls, stream):
@@ -271,6 +483,12 @@ class Symbol(Type):
 
         return cls(''.join(value[:-1]).decode('utf-8'))
 
+    @classmethod
+    def decode(cls, data, offset):
+        end = data.find('\x00', offset)
+
+        return cls(data[offset:end]), end + 1
+
     def dump(self, stream):
         stream.write(struct.pack('<B', consts.SYMBOL))
         stream.write(self.value.encode('utf-8'))
@@ -286,6 +504,8 @@ class Symbol(Type):
 @serializable(consts.STRING)
 class String(Type):
 
+    length = struct.Struct('<I')
+
     def __init__(self, value):
         if isinstance(value, str):
             value = value.decode('utf-8')
@@ -295,6 +515,9 @@ class String(Type):
     def __eq__(self, other):
         return isinstance(other, String) and self.value == other.value
 
+    def __hash__(self):
+        return hash((u'string', self.value))
+
     def __nonzero__(self):
         return bool(self.value)
 
@@ -304,6 +527,13 @@ class String(Type):
 
         return cls(stream.read(length).decode('utf-8'))
 
+    @classmethod
+    def decode(cls, data, offset):
+        (length,) = cls.length.unpack_from(data, offset)
+        offset += cls.length.size
+
+        return cls(data[offset:offset + length].decode('utf-8')), offset + length
+
     def dump(self, stream):
         value = self.value.encode('utf-8')
 
@@ -317,12 +547,60 @@ class String(Type):
         return self
 
 
+@serializable(consts.PAIR)
 class Pair(Type):
 
     def __init__(self, head, tail):
         self.head = head
         self.tail = tail
 
+    @classmethod
+    def load(cls, stream):
+        heads = [load(stream)]
+
+        while True:
+            (type,) = struct.unpack('<B', stream.read(struct.calcsize('<B')))
+
+            if type != consts.PAIR:
+                break
+
+            heads.append(load(stream))
+
+        result = serializable_types[type].load(stream)
+
+        for head in reversed(heads):
+            result = cls(head, result)
+
+        return result
+
+    @classmethod
+    def decode(cls, data, offset):
+        head, offset = decode(data, offset)
+        heads = [head]
+
+        while ord(data[offset]) == consts.PAIR:
+            head, offset = decode(data, offset + 1)
+
+            heads.append(head)
+
+        result, offset = decode(data, offset)
+
+        for head in reversed(heads):
+            result = cls(head, result)
+
+        return result, offset
+
+    def dump(self, stream):
+        value = self
+
+        while isinstance(value, Pair):
+            stream.write(struct.pack('<B', consts.PAIR))
+            value.head.dump(stream)
+
+            value = value.tail
+
+        value.dump(stream)
+
     @classmethod
     def from_sequence(self, sequence):
         result = Nil()
@@ -367,6 +645,7 @@ class Pair(Type):
         return Bool(True)
 
 
+@serializable(consts.QUOTED)
 class Quoted(Type):
 
     def __init__(self, value):
@@ -375,6 +654,23 @@ class Quoted(Type):
     def __eq__(self, other):
         return isinstance(other, Quoted) and self.value == other.value
 
+    def __hash__(self):
+        return hash(('quoted', self.value))
+
+    @classmethod
+    def load(cls, stream):
+        return cls(load(stream))
+
+    @classmethod
+    def decode(cls, data, offset):
+        value, offset = decode(data, offset)
+
+        return cls(value), offset
+
+    def dump(self, stream):
+        stream.write(struct.pack('<B', consts.QUOTED))
+        self.value.dump(stream)
+
     def to_bool(self):
         return Bool(True)
 
@@ -382,6 +678,7 @@ class Quoted(Type):
         return String(u'\'{0}'.format(self.value))
 
 
+@serializable(consts.QUASIQUOTED)
 class Quasiquoted(Type):
 
     def __init__(self, value):
@@ -390,6 +687,23 @@ class Quasiquoted(Type):
     def __eq__(self, other):
         return isinstance(other, Quasiquoted) and self.value == other.value
 
+    def __hash__(self):
+        return hash(('quasiquoted', self.value))
+
+    @classmethod
+    def load(cls, stream):
+        return cls(load(stream))
+
+    @classmethod
+    def decode(cls, data, offset):
+        value, offset = decode(data, offset)
+
+        return cls(value), offset
+
+    def dump(self, stream):
+        stream.write(struct.pack('<B', consts.QUASIQUOTED))
+        self.value.dump(stream)
+
     def to_bool(self):
         return Bool(True)
 
@@ -397,6 +711,7 @@ class Quasiquoted(Type):
         return String(u'`{0}'.format(self.value))
 
 
+@serializable(consts.UNQUOTED)
 class Unquoted(Type):
 
     def __init__(self, value):
@@ -405,6 +720,23 @@ class Unquoted(Type):
     def __eq__(self, other):
         return isinstance(other, Unquoted) and self.value == other.value
 
+    def __hash__(self):
+        return hash(('unquoted', self.value))
+
+    @classmethod
+    def load(cls, stream):
+        return cls(load(stream))
+
+    @classmethod
+    def decode(cls, data, offset):
+        value, offset = decode(data, offset)
+
+        return cls(value), offset
+
+    def dump(self, stream):
+        stream.write(struct.pack('<B', consts.UNQUOTED))
+        self.value.dump(stream)
+
     def to_bool(self):
         return Bool(True)
 
@@ -428,9 +760,10 @@ class Function(Type):
 
 class NativeFunction(Function):
 
-    def __init__(self, function, name=None):
+    def __init__(self, function, name=None, pass_vm=False):
         self.function = function
         self.name = name
+        self.pass_vm = pass_vm
 
     def __call__(self, *args):
         return self.function(*args)
@@ -444,19 +777,36 @@ class NativeFunction(Function):
 
 class Macro(Type):
 
+    pure = True
+
     def __init__(self, rules):
         self.rules = rules
+        self.tree = DecisionTree(rules)
 
     def to_string(self):
         return String(u'(syntax)')
 
-    def expand(self, vm, expression):
-        for rule in self.rules:
+    def match(self, expression):
+        return self.tree.match(expression)
+
+    def expand(self, vm, expression, tail=False):
+        if self.pure:
+            result = expansion_cache.get(expression, (self, tail))
+
+            if result is not None:
+                return result
+
+        for rule, bindings in self.match(expression):
             try:
-                return rule.expand(vm, expression)
+                result = rule.apply(vm, bindings, tail)
 
             except MatchError:
-                pass
+                continue
+
+            if self.pure:
+                expansion_cache.put(expression, (self, tail), result)
+
+            return result
 
         raise MatchError()
 
@@ -467,12 +817,17 @@ class Rule(Type):
         self.pattern = pattern
         self.templates = templates
 
-    def expand(self, vm, expression):
+    def expand(self, vm, expression, tail=False):
+        return self.apply(vm, self.pattern.match(expression), tail)
+
+    def apply(self, vm, bindings, tail=False):
         result = []
-        bindings = self.pattern.match(expression)
 
-        for template in self.templates:
-            result.append(template.expand(bindings))
+        for i, template in enumerate(self.templates):
+            result.append(template.expand(
+                bindings,
+                tail and i + 1 == len(self.templates)
+            ))
 
         return result
 
@@ -481,10 +836,124 @@ class Pattern(Type):
 
     def __init__(self, pattern):
         self.pattern = pattern
+        self.matcher = self.compile(pattern)
 
     def match(self, expression):
         return self.match_pattern(self.pattern, expression)
 
+    def test(self, expression):
+        bindings = collections.defaultdict(list)
+
+        if self.matcher(expression, bindings):
+            return bindings
+
+    def variables(self, pattern):
+        if isinstance(pattern, Pair):
+            return self.variables(pattern.head) + self.variables(pattern.tail)
+
+        elif isinstance(pattern, Symbol) and pattern != Symbol('_'):
+            return [pattern]
+
+        return []
+
+    def compile(self, pattern):
+        if isinstance(pattern, Pair):
+            return self.compile_pair(pattern)
+
+        elif isinstance(pattern, Symbol):
+            return self.compile_symbol(pattern)
+
+        elif isinstance(pattern, Quoted):
+            value = pattern.value
+
+            if isinstance(value, Symbol):
+                return lambda expression, bindings: value is expression
+
+            return lambda expression, bindings: value == expression
+
+        return lambda expression, bindings: pattern == expression
+
+    def compile_symbol(self, pattern):
+        if pattern is Symbol('_'):
+            return lambda expression, bindings: True
+
+        def match(expression, bindings):
+            bindings[pattern] = expression
+
+            return True
+
+        return match
+
+    def compile_pair(self, pattern):
+        fixed = []
+        repeated = None
+        names = []
+
+        while isinstance(pattern, Pair):
+            if isinstance(pattern.tail, Pair) and pattern.tail.head == Ellipsis():
+                if pattern.tail.tail != Nil():
+                    return lambda expression, bindings: False
+
+                repeated = self.compile(pattern.head)
+                names = self.variables(pattern.head)
+
+                break
+
+            fixed.append(self.compile(pattern.head))
+
+            pattern = pattern.tail
+
+        rest = None
+
+        if repeated is None and not isinstance(pattern, Nil):
+            rest = self.compile(pattern)
+
+        def match(expression, bindings):
+            if not isinstance(expression, (Pair, Nil)):
+                return False
+
+            for matcher in fixed:
+                if not isinstance(expression, Pair):
+                    return False
+
+                if not matcher(expression.head, bindings):
+                    return False
+
+                expression = expression.tail
+
+            if rest is not None:
+                return rest(expression, bindings)
+
+            elif repeated is None:
+                return isinstance(expression, Nil)
+
+            values = collections.defaultdict(list)
+
+            if isinstance(expression, Nil):
+                for name in names:
+                    values[name] = []
+
+            while isinstance(expression, Pair):
+                element = {}
+
+                if not repeated(expression.head, element):
+                    return False
+
+                for key, value in element.iteritems():
+                    values[key].append(value)
+
+                expression = expression.tail
+
+            if not isinstance(expression, Nil):
+                return False
+
+            for key, value in values.iteritems():
+                bindings[key] = Pair.from_sequence(value)
+
+            return True
+
+        return match
+
     def match_pattern(self, pattern, expression):
         if isinstance(pattern, Pair):
             return self.match_pair(pattern, expression)
@@ -563,126 +1032,394 @@ class Pattern(Type):
         raise MatchError()
 
 
-class Template(object):
-
-    def __init__(self, template):
-        self.template = template
+class DecisionNode(object):
 
-    def expand(self, bindings):
-        compiler = mania.compiler.SimpleCompiler(Nil())
+    __slots__ = ('symbols', 'symbol', 'list', 'atom', 'end', 'dotted', 'rest')
 
-        if isinstance(self.template, Quasiquoted):
-            compiler.compile_any(
-                self.expand_template(self.template.value, bindings, None)
-            )
+    def __init__(self):
+        self.symbols = {}
+        self.symbol = None
+        self.list = None
+        self.atom = None
+        self.end = ()
+        self.dotted = ()
+        self.rest = False
 
-        else:
-            compiler.compile_any(self.template)
 
-        compiler.builder.add(mania.instructions.Eval())
+class DecisionTree(object):
 
-        module = compiler.builder.module
+    '''
+    Merges the patterns of a rule set into one tree over the elements of
+    the expression list. Each node branches on the kind of the element at
+    its position, literal symbols get a branch of their own, and a node
+    lists the rules that match if the expression ends there. Nodes with
+    the same remaining rules are shared, so the tree is built once and
+    stays small. Only the compiled matchers of the selected rules run, to
+    check nested patterns and to collect the bindings.
+    '''
 
-        return module.code(
-            module.entry_point,
-            len(module) - module.entry_point
+    def __init__(self, rules):
+        self.rules = rules
+        self.shapes = [self.shape(rule.pattern.pattern) for rule in rules]
+        self.atoms = tuple(
+            rule for rule, shape in zip(rules, self.shapes) if shape is None
         )
 
-    def expand_template(self, template, bindings, index):
-        if isinstance(template, Pair):
-            return self.expand_pair(template, bindings, index)
+        nodes = {}
 
-        elif isinstance(template, Unquoted):
-            return self.expand_unquoted(template, bindings, index)
+        self.root = self.build(tuple(xrange(len(rules))), 0, nodes)
 
-        elif isinstance(template, Quoted):
-            return Quoted(self.expand_template(template.value, bindings, index))
+    def shape(self, pattern):
+        if not isinstance(pattern, Pair):
+            return None
 
-        elif isinstance(template, Quasiquoted):
-            return Quasiquoted(self.expand_template(template.value, bindings, index))
+        requirements = []
+        variadic = False
 
-        return template
+        while isinstance(pattern, Pair):
+            if isinstance(pattern.tail, Pair) and pattern.tail.head == Ellipsis():
+                variadic = True
 
-    def expand_pair(self, template, bindings, index):
-        if isinstance(template.tail, Pair) and template.tail.head == Ellipsis():
-            result = []
-            i = 0
+                break
 
-            while True:
-                try:
-                    result.append(self.expand_template(
-                        template.head, bindings, (index or []) + [i]
-                    ))
+            if isinstance(pattern.head, (Pair, Nil)):
+                requirements.append('list')
 
-                    i += 1
+            elif (isinstance(pattern.head, Quoted) and
+                    isinstance(pattern.head.value, Symbol)):
+                requirements.append(pattern.head.value)
 
-                except IndexError:
-                    if i != 0:
-                        result = Pair.from_sequence(result)
+            else:
+                requirements.append(None)
 
-                    break
+            pattern = pattern.tail
 
-            tail = self.expand_template(
-                template.tail.tail, bindings, index
-            )
+        dotted = not variadic and not isinstance(pattern, Nil)
 
-            if not result and not tail:
-                raise IndexError()
+        return tuple(requirements), variadic, dotted
 
-            if not result:
-                return tail
+    def accepts(self, shape, depth, kind):
+        if shape is None:
+            return True
 
-            result.concat(tail)
+        requirements, variadic, dotted = shape
 
-            return result
+        if depth >= len(requirements):
+            return variadic or dotted
 
-        return Pair(
-            self.expand_template(template.head, bindings, index),
-            self.expand_template(template.tail, bindings, index)
-        )
+        requirement = requirements[depth]
 
-    def expand_unquoted(self, template, bindings, index):
-        if not isinstance(template.value, Symbol):
-            raise MatchError()
+        if requirement is None:
+            return True
 
-        if index is None:
-            return bindings[template.value]
+        elif requirement == 'list':
+            return kind == 'list'
 
-        result = bindings[template.value]
+        return requirement is kind
 
-        for i in index:
-            result = result[i]
+    def build(self, alive, depth, nodes):
+        try:
+            return nodes[depth, alive]
 
-        return result
+        except KeyError:
+            node = nodes[depth, alive] = DecisionNode()
 
+        end = []
+        dotted = []
+        literals = set()
+        node.rest = True
 
-class NativeMacro(Macro):
+        for index in alive:
+            shape = self.shapes[index]
 
-    def to_string(self):
-        return String(u'(native-syntax)')
+            if shape is None:
+                end.append(index)
+                dotted.append(index)
 
+                continue
 
-class NativeRule(object):
+            requirements, variadic, improper = shape
 
-    def __init__(self, pattern, template):
-        self.pattern = pattern
-        self.template = template
+            if depth < len(requirements):
+                node.rest = False
 
-    def expand(self, vm, expression):
-        result = []
-        bindings = self.pattern.match(expression)
+                if isinstance(requirements[depth], Symbol):
+                    literals.add(requirements[depth])
 
-        return self.template(vm, bindings)
+                continue
 
+            end.append(index)
 
-class Annotation(Type):
-    pass
+            if improper:
+                dotted.append(index)
 
+            elif not variadic:
+                node.rest = False
 
-class Code(Type):
+        node.end = tuple(self.rules[index] for index in end)
+        node.dotted = tuple(self.rules[index] for index in dotted)
 
-    def __init__(self, module, entry_point, size):
-        self.module = module
+        if not node.rest:
+            for literal in literals:
+                node.symbols[literal] = self.child(alive, depth, literal, nodes)
+
+            node.symbol = self.child(alive, depth, 'symbol', nodes)
+            node.list = self.child(alive, depth, 'list', nodes)
+            node.atom = self.child(alive, depth, 'atom', nodes)
+
+        return node
+
+    def child(self, alive, depth, kind, nodes):
+        alive = tuple(
+            index for index in alive
+            if self.accepts(self.shapes[index], depth, kind)
+        )
+
+        if alive:
+            return self.build(alive, depth + 1, nodes)
+
+    def select(self, expression):
+        if not isinstance(expression, (Pair, Nil)):
+            return self.atoms
+
+        node = self.root
+
+        while isinstance(expression, Pair):
+            if node.rest:
+                while isinstance(expression, Pair):
+                    expression = expression.tail
+
+                break
+
+            head = expression.head
+
+            if isinstance(head, Symbol):
+                node = node.symbols.get(head, node.symbol)
+
+            elif isinstance(head, (Pair, Nil)):
+                node = node.list
+
+            else:
+                node = node.atom
+
+            if node is None:
+                return ()
+
+            expression = expression.tail
+
+        if isinstance(expression, Nil):
+            return node.end
+
+        return node.dotted
+
+    def match(self, expression):
+        for rule in self.select(expression):
+            bindings = rule.pattern.test(expression)
+
+            if bindings is not None:
+                yield rule, bindings
+
+
+class Template(object):
+
+    def __init__(self, template):
+        self.template = template
+
+        if isinstance(template, Quasiquoted):
+            self.instantiate = self.compile_template(template.value)
+
+        else:
+            self.instantiate = lambda bindings: template
+
+        self.skeletons = {
+            tail: Bytecode([
+                mania.instructions.LoadConstant(1),
+                mania.instructions.TailEval() if tail else mania.instructions.Eval()
+            ])
+            for tail in (False, True)
+        }
+        self.caches = {False: {}, True: {}}
+
+    def expand(self, bindings, tail=False):
+        module = Module(
+            name=Nil(),
+            entry_point=0,
+            constants=[Nil(), self.instantiate(bindings)],
+            instructions=self.skeletons[tail],
+            caches=self.caches[tail]
+        )
+
+        return module.code(0, len(module))
+
+    def holes(self, template):
+        if isinstance(template, Pair):
+            return self.holes(template.head) + self.holes(template.tail)
+
+        elif isinstance(template, Unquoted):
+            return [template.value]
+
+        elif isinstance(template, (Quoted, Quasiquoted)):
+            return self.holes(template.value)
+
+        return []
+
+    def compile_template(self, template):
+        if not self.holes(template):
+            return lambda bindings: template
+
+        elif isinstance(template, Pair):
+            return self.compile_pair(template)
+
+        elif isinstance(template, Unquoted):
+            return self.compile_unquoted(template)
+
+        elif isinstance(template, Quoted):
+            value = self.compile_template(template.value)
+
+            return lambda bindings: Quoted(value(bindings))
+
+        value = self.compile_template(template.value)
+
+        return lambda bindings: Quasiquoted(value(bindings))
+
+    def compile_pair(self, template):
+        if isinstance(template.tail, Pair) and template.tail.head == Ellipsis():
+            return self.compile_ellipsis(template)
+
+        head = self.compile_template(template.head)
+        tail = self.compile_template(template.tail)
+
+        return lambda bindings: Pair(head(bindings), tail(bindings))
+
+    def compile_ellipsis(self, template):
+        names = self.holes(template.head)
+        head = self.compile_template(template.head)
+        tail = self.compile_template(template.tail.tail)
+
+        if not names:
+            raise ExpandError('ellipsis template without pattern variables')
+
+        def expand(bindings):
+            sequences = [(name, list(bindings[name])) for name in names]
+            result = []
+
+            for i in xrange(min(len(sequence) for _, sequence in sequences)):
+                scope = collections.defaultdict(list, bindings)
+
+                for name, sequence in sequences:
+                    scope[name] = sequence[i]
+
+                try:
+                    result.append(head(scope))
+
+                except IndexError:
+                    break
+
+            rest = tail(bindings)
+
+            if not result and not rest:
+                raise IndexError()
+
+            if not result:
+                return rest
+
+            result = Pair.from_sequence(result)
+            result.concat(rest)
+
+            return result
+
+        return expand
+
+    def compile_unquoted(self, template):
+        name = template.value
+
+        if not isinstance(name, Symbol):
+            def expand(bindings):
+                raise MatchError()
+
+            return expand
+
+        return lambda bindings: bindings[name]
+
+
+class NativeMacro(Macro):
+
+    def __init__(self, rules, pure=False):
+        Macro.__init__(self, rules)
+
+        self.pure = pure
+
+    def to_string(self):
+        return String(u'(native-syntax)')
+
+
+class NativeRule(object):
+
+    def __init__(self, pattern, template):
+        self.pattern = pattern
+        self.template = template
+
+    def expand(self, vm, expression, tail=False):
+        return self.apply(vm, self.pattern.match(expression), tail)
+
+    def apply(self, vm, bindings, tail=False):
+        return self.template(vm, bindings, tail)
+
+
+class Annotation(Type):
+    pass
+
+
+class Layout(Type):
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.indices = dict((name, i) for i, name in enumerate(self.names))
+
+    def __eq__(self, other):
+        return isinstance(other, Layout) and self.names == other.names
+
+    def __hash__(self):
+        return hash(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def to_string(self):
+        return String(u'(layout {0})'.format(
+            u' '.join(name.value for name in self.names)
+        ))
+
+
+class Local(Type):
+
+    def __init__(self, name, depth, index):
+        self.name = name
+        self.depth = depth
+        self.index = index
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Local) and
+            self.name == other.name and
+            self.depth == other.depth and
+            self.index == other.index
+        )
+
+    def __hash__(self):
+        return hash((self.name, self.depth, self.index))
+
+    def to_bool(self):
+        return Bool(True)
+
+    def to_string(self):
+        return self.name.to_string()
+
+
+class Code(Type):
+
+    def __init__(self, module, entry_point, size):
+        self.module = module
         self.entry_point = entry_point
         self.size = size
 
@@ -697,6 +1434,9 @@ class Code(Type):
             self.size == other.size
         )
 
+    def __hash__(self):
+        return hash((self.module, self.entry_point, self.size))
+
     def __len__(self):
         return self.size
 
@@ -721,14 +1461,197 @@ class Code(Type):
             self.module.instructions[index] = instruction
 
 
+class Bytecode(object):
+
+    __slots__ = ('opcodes', 'arguments', 'operands')
+
+    def __init__(self, instructions=()):
+        self.opcodes = array.array('B')
+        self.arguments = array.array('i')
+        self.operands = None
+
+        for instruction in instructions:
+            self.append(instruction)
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __getitem__(self, index):
+        cls = mania.instructions.opcodes[self.opcodes[index]]
+        arguments = (self.arguments[index], self.operand(index))
+
+        return cls(*arguments[:len(cls.fields)])
+
+    def __setitem__(self, index, instruction):
+        arguments = instruction.arguments + (0, 0)
+
+        self.opcodes[index] = instruction.opcode
+        self.arguments[index] = arguments[0]
+
+        if arguments[1] or self.operands is not None:
+            self.expand()[index] = arguments[1]
+
+    def operand(self, index):
+        if self.operands is None:
+            return 0
+
+        return self.operands[index]
+
+    def expand(self):
+        if self.operands is None:
+            self.operands = array.array('i', [0]) * len(self.opcodes)
+
+        return self.operands
+
+    def append(self, instruction):
+        arguments = instruction.arguments + (0, 0)
+
+        self.opcodes.append(instruction.opcode)
+        self.arguments.append(arguments[0])
+
+        if self.operands is not None:
+            self.operands.append(arguments[1])
+
+        elif arguments[1]:
+            self.expand()[-1] = arguments[1]
+
+    @classmethod
+    def decode(cls, data, offset, end):
+        decoders = mania.instructions.decoders
+        bytecode = cls()
+        opcodes = bytecode.opcodes
+        arguments = bytecode.arguments
+        operands = array.array('i')
+
+        while offset < end:
+            instruction, fields, width = decoders[data[offset]]
+            offset += 1
+
+            opcodes.append(instruction.opcode)
+
+            if fields is None:
+                arguments.append(0)
+                operands.append(0)
+
+            else:
+                values = fields.unpack_from(data, offset) + (0,)
+
+                arguments.append(values[0])
+                operands.append(values[1])
+
+                offset += width
+
+        if any(operands):
+            bytecode.operands = operands
+
+        return bytecode
+
+    @classmethod
+    def decode_v2(cls, data, offset, end):
+        bytecode = cls()
+
+        if offset == end:
+            return bytecode
+
+        count, offset = decode_varint(data, offset)
+
+        bytecode.opcodes, offset = decode_column(data, offset, count, 'B')
+        bytecode.arguments, offset = decode_column(data, offset, count)
+
+        if ord(data[offset]):
+            bytecode.operands, offset = decode_column(data, offset, count)
+
+        else:
+            offset += 1
+
+        if offset != end:
+            raise FormatError('code section does not match its size')
+
+        return bytecode
+
+    def encode(self):
+        opcodes = mania.instructions.opcodes
+        code = []
+
+        for opcode, argument, operand in itertools.izip(
+            self.opcodes,
+            self.arguments,
+            self.operands or itertools.repeat(0)
+        ):
+            instruction = opcodes[opcode]
+
+            code.append(chr(opcode))
+
+            if instruction.operands is not None:
+                code.append(instruction.operands.pack(
+                    *(argument, operand)[:len(instruction.fields)]
+                ))
+
+        return ''.join(code)
+
+    def encode_v2(self):
+        return ''.join([
+            encode_varint(len(self)),
+            encode_column(self.opcodes),
+            encode_column(self.arguments),
+            encode_column(self.operands or ())
+        ])
+
+
+class LazyBytecode(Bytecode):
+
+    __slots__ = ('module', 'start', 'end', 'checksum', 'decoded')
+
+    def __init__(self, module, start, end, checksum=None):
+        self.module = module
+        self.start = start
+        self.end = end
+        self.checksum = checksum
+        self.decoded = False
+
+    def __getattr__(self, name):
+        if name not in Bytecode.__slots__:
+            raise AttributeError(name)
+
+        with self.module.lock:
+            if not self.decoded:
+                data = self.module.data
+
+                if self.checksum is not None:
+                    verify(data, self.start, self.end, self.checksum)
+
+                if self.module.version == consts.FORMAT_V2:
+                    decode = Bytecode.decode_v2
+
+                else:
+                    decode = Bytecode.decode
+
+                code = decode(data, self.start, self.end)
+
+                self.arguments = code.arguments
+                self.operands = code.operands
+                self.opcodes = code.opcodes
+                self.decoded = True
+
+        return getattr(self, name)
+
+
 class Module(Type):
 
-    def __init__(self, name, entry_point, constants, instructions, scope=None):
+    prefix = struct.Struct('<3sBI')
+    header = struct.Struct('<3sBIIIII')
+    header_v2 = struct.Struct('<3sBIIII')
+    checksum = struct.Struct('<I')
+
+    def __init__(self, name, entry_point, constants, instructions, scope=None,
+                 exports=None, caches=None):
         self.name = name
         self.entry_point = entry_point
         self.constants = constants
         self.instructions = instructions
         self.scope = scope
+        self.exports = exports
+        self.caches = {} if caches is None else caches
 
     def to_string(self):
         return String(u'(module {0})'.format(self.name))
@@ -739,51 +1662,98 @@ class Module(Type):
     @classmethod
     def load(cls, stream):
         if isinstance(stream, basestring):
-            stream = io.BytesIO(stream)
+            return cls.loads(stream)
 
-        (header, flags, version, name, entry, count, size) = struct.unpack(
-            '<3sBIIIII',
-            stream.read(struct.calcsize('<3sBIIIII'))
-        )
+        return cls.loads(stream.read())
+
+    @classmethod
+    def loads(cls, data):
+        (header, flags, version) = cls.prefix.unpack_from(data, 0)
 
         assert header == 'bam'
 
+        if version == consts.FORMAT_V2:
+            return cls.loads_v2(data)
+
+        (header, flags, version, name, entry, count, size) = (
+            cls.header.unpack_from(data, 0)
+        )
+
+        offset = cls.header.size
         constants = []
 
         for _ in xrange(count):
-            (type,) = struct.unpack('<B', stream.read(struct.calcsize('<B')))
+            type = serializable_types[ord(data[offset])]
+            constant, offset = type.decode(data, offset + 1)
 
-            constants.append(serializable_types[type].load(stream))
+            constants.append(constant)
 
-        code = []
+        return cls(
+            name=constants[name],
+            entry_point=entry,
+            constants=constants,
+            instructions=Bytecode.decode(data, offset, offset + size)
+        )
+
+    @classmethod
+    def loads_v2(cls, data):
+        name, entry, sections = read_sections(data)
+        strings = read_strings(data, sections)
+        constants = read_constants(data, sections, strings)
+        start, end = read_code(data, sections)
+
+        return cls(
+            name=constants[name],
+            entry_point=entry,
+            constants=constants,
+            instructions=Bytecode.decode_v2(data, start, end),
+            exports=read_exports(data, sections, strings)
+        )
+
+    @classmethod
+    def load_stream(cls, stream):
+        if isinstance(stream, basestring):
+            stream = io.BytesIO(stream)
 
-        while size > 0:
-            (opcode,) = struct.unpack('<B', stream.read(struct.calcsize('<B')))
+        prefix = stream.read(cls.prefix.size)
 
-            instruction = mania.instructions.opcodes[opcode].load(stream)
+        (header, flags, version) = cls.prefix.unpack(prefix)
 
-            code.append(instruction)
+        assert header == 'bam'
+
+        if version == consts.FORMAT_V2:
+            return cls.loads_v2(prefix + stream.read())
 
-            size -= instruction.size
+        (name, entry, count, size) = struct.unpack(
+            '<IIII',
+            stream.read(struct.calcsize('<IIII'))
+        )
+
+        constants = []
+
+        for _ in xrange(count):
+            (type,) = struct.unpack('<B', stream.read(struct.calcsize('<B')))
+
+            constants.append(serializable_types[type].load(stream))
 
         return cls(
             name=constants[name],
             entry_point=entry,
             constants=constants,
-            instructions=code
+            instructions=Bytecode.decode(stream.read(size), 0, size)
         )
 
-    def dumps(self):
-        return self.dump().getvalue()
+    def dumps(self, version=consts.FORMAT_V2):
+        return self.dump(version=version).getvalue()
 
-    def dump(self, stream=None):
+    def dump(self, stream=None, version=consts.FORMAT_V2):
         if stream is None:
             stream = io.BytesIO()
 
-        code = io.BytesIO()
+        if version == consts.FORMAT_V2:
+            return self.dump_v2(stream)
 
-        for instruction in self.instructions:
-            instruction.dump(code)
+        code = self.instructions.encode()
 
         stream.write(struct.pack(
             '<3sBIIIII',
@@ -793,16 +1763,114 @@ class Module(Type):
             self.constants.index(self.name),
             self.entry_point,
             len(self.constants),
-            len(code.getvalue())
+            len(code)
         ))
 
         for constant in self.constants:
             constant.dump(stream)
 
-        stream.write(code.getvalue())
+        stream.write(code)
+
+        return stream
+
+    def dump_v2(self, stream):
+        strings = []
+        indices = {}
+
+        def string(value):
+            try:
+                return indices[value]
+
+            except KeyError:
+                index = indices[value] = len(strings)
+
+                strings.append(value)
+
+                return index
+
+        constants = io.BytesIO()
+        constants.write(encode_varint(len(self.constants)))
+
+        def constant(value):
+            while type(value) is Pair:
+                constants.write(chr(consts.PAIR))
+                constant(value.head)
+
+                value = value.tail
+
+            if type(value) is Symbol:
+                constants.write(chr(consts.SYMBOL))
+                constants.write(encode_varint(string(value.value)))
+
+            elif type(value) is String:
+                constants.write(chr(consts.STRING))
+                constants.write(encode_varint(string(value.value)))
+
+            elif type(value) is Integer:
+                constants.write(chr(consts.INTEGER))
+                constants.write(encode_signed(value.value))
+
+            elif type(value) in (Quoted, Quasiquoted, Unquoted):
+                constants.write(chr(serializable_codes[type(value)]))
+                constant(value.value)
+
+            else:
+                value.dump(constants)
+
+        for value in self.constants:
+            constant(value)
+
+        sections = []
+
+        if self.exports is not None:
+            exports = [encode_varint(len(self.exports))]
+
+            for name in self.exports:
+                exports.append(encode_varint(string(name.value)))
+
+            sections.append((consts.SECTION_EXPORTS, ''.join(exports)))
+
+        table = [encode_varint(len(strings))]
+
+        for value in strings:
+            value = value.encode('utf-8')
+
+            table.append(encode_varint(len(value)))
+            table.append(value)
+
+        sections[:0] = [
+            (consts.SECTION_STRINGS, ''.join(table)),
+            (consts.SECTION_CONSTANTS, constants.getvalue()),
+            (consts.SECTION_CODE, self.instructions.encode_v2())
+        ]
+
+        directory = [encode_varint(len(sections))]
+
+        for kind, data in sections:
+            directory.append(chr(kind))
+            directory.append(encode_varint(len(data)))
+            directory.append(self.checksum.pack(zlib.crc32(data) & 0xffffffff))
+
+        directory = ''.join(directory)
+
+        stream.write(self.header_v2.pack(
+            'bam',
+            0,
+            consts.FORMAT_V2,
+            self.constants.index(self.name),
+            self.entry_point,
+            zlib.crc32(directory) & 0xffffffff
+        ))
+        stream.write(directory)
+
+        for _, data in sections:
+            stream.write(data)
 
         return stream
 
+    def flatten(self):
+        return LazyModule(self.dumps(), self.scope)
+
     def lookup(self, name):
         return self.scope.lookup(name)
 
@@ -810,11 +1878,300 @@ class Module(Type):
         return Code(self, entry_point, size or len(self) - entry_point)
 
 
+def read_sections(data):
+    (header, flags, version, name, entry, checksum) = (
+        Module.header_v2.unpack_from(data, 0)
+    )
+
+    start = Module.header_v2.size
+    count, offset = decode_varint(data, start)
+    directory = []
+
+    for _ in xrange(count):
+        kind = ord(data[offset])
+        length, offset = decode_varint(data, offset + 1)
+        (crc,) = Module.checksum.unpack_from(data, offset)
+
+        directory.append((kind, length, crc))
+
+        offset += Module.checksum.size
+
+    verify(data, start, offset, checksum)
+
+    sections = {}
+
+    for kind, length, crc in directory:
+        sections[kind] = (offset, offset + length, crc)
+
+        offset += length
+
+    if offset != len(data):
+        raise FormatError('module sections do not match its size')
+
+    return name, entry, sections
+
+
+def verify(data, start, end, checksum):
+    if zlib.crc32(buffer(data, start, end - start)) & 0xffffffff != checksum:
+        raise FormatError('module checksum mismatch')
+
+
+def read_section(data, sections, kind):
+    if kind not in sections:
+        return 0, 0
+
+    offset, end, checksum = sections[kind]
+
+    verify(data, offset, end, checksum)
+
+    count, offset = decode_varint(data, offset)
+
+    return offset, count
+
+
+def read_code(data, sections):
+    if consts.SECTION_CODE not in sections:
+        return 0, 0
+
+    start, end, checksum = sections[consts.SECTION_CODE]
+
+    verify(data, start, end, checksum)
+
+    return start, end
+
+
+def decode_string(data, offset):
+    length, offset = decode_varint(data, offset)
+
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+
+def decode_constant(data, offset, strings):
+    kind = ord(data[offset])
+    offset += 1
+
+    if kind == consts.PAIR:
+        head, offset = decode_constant(data, offset, strings)
+        heads = [head]
+
+        while ord(data[offset]) == consts.PAIR:
+            head, offset = decode_constant(data, offset + 1, strings)
+
+            heads.append(head)
+
+        value, offset = decode_constant(data, offset, strings)
+
+        for head in reversed(heads):
+            value = Pair(head, value)
+
+        return value, offset
+
+    elif kind == consts.SYMBOL:
+        index, offset = decode_varint(data, offset)
+
+        return Symbol(strings[index]), offset
+
+    elif kind == consts.STRING:
+        index, offset = decode_varint(data, offset)
+
+        return String(strings[index]), offset
+
+    elif kind == consts.INTEGER:
+        value, offset = decode_signed(data, offset)
+
+        return Integer(value), offset
+
+    elif kind in (consts.QUOTED, consts.QUASIQUOTED, consts.UNQUOTED):
+        value, offset = decode_constant(data, offset, strings)
+
+        return serializable_types[kind](value), offset
+
+    return serializable_types[kind].decode(data, offset)
+
+
+def read_strings(data, sections):
+    offset, count = read_section(data, sections, consts.SECTION_STRINGS)
+    strings = []
+
+    for _ in xrange(count):
+        value, offset = decode_string(data, offset)
+
+        strings.append(value)
+
+    return strings
+
+
+def read_constants(data, sections, strings):
+    offset, count = read_section(data, sections, consts.SECTION_CONSTANTS)
+    constants = []
+
+    for _ in xrange(count):
+        value, offset = decode_constant(data, offset, strings)
+
+        constants.append(value)
+
+    return constants
+
+
+def read_exports(data, sections, strings):
+    if consts.SECTION_EXPORTS not in sections:
+        return None
+
+    offset, count = read_section(data, sections, consts.SECTION_EXPORTS)
+    exports = []
+
+    for _ in xrange(count):
+        index, offset = decode_varint(data, offset)
+
+        exports.append(Symbol(strings[index]))
+
+    return exports
+
+
+class LazyModule(Module):
+
+    def __init__(self, data, scope=None):
+        (header, flags, version) = self.prefix.unpack_from(data, 0)
+
+        assert header == 'bam'
+
+        self.data = data
+        self.version = version
+        self.lock = threading.RLock()
+
+        if version == consts.FORMAT_V2:
+            name, entry, sections = read_sections(data)
+            strings = LazyStrings(
+                self,
+                *read_section(data, sections, consts.SECTION_STRINGS)
+            )
+            constants = LazyConstantsV2(
+                self,
+                strings,
+                *read_section(data, sections, consts.SECTION_CONSTANTS)
+            )
+            start, end, checksum = sections.get(
+                consts.SECTION_CODE,
+                (0, 0, None)
+            )
+            exports = read_exports(data, sections, strings)
+
+        else:
+            (header, flags, version, name, entry, count, size) = (
+                self.header.unpack_from(data, 0)
+            )
+
+            constants = LazyConstants(self, self.header.size, count)
+            start, end, checksum = len(data) - size, len(data), None
+            exports = None
+
+        Module.__init__(
+            self,
+            name=constants[name],
+            entry_point=entry,
+            constants=constants,
+            instructions=LazyBytecode(self, start, end, checksum),
+            scope=scope,
+            exports=exports
+        )
+
+    @classmethod
+    def map(cls, filename):
+        with open(filename, 'rb') as stream:
+            return cls(mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def dump(self, stream=None, version=None):
+        if version is not None and version != self.version:
+            return Module.dump(self, stream, version)
+
+        if stream is None:
+            stream = io.BytesIO()
+
+        if self.version == consts.FORMAT_V2:
+            header = self.header_v2
+
+        else:
+            header = self.header
+
+        fields = list(header.unpack_from(self.data, 0))
+        fields[4] = self.entry_point
+
+        stream.write(header.pack(*fields))
+        stream.write(buffer(
+            self.data,
+            header.size,
+            len(self.data) - header.size
+        ))
+
+        return stream
+
+
+class LazySequence(collections.Sequence):
+
+    def __init__(self, module, offset, count):
+        self.module = module
+        self.offset = offset
+        self.count = count
+        self.items = []
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+
+        try:
+            return self.items[index]
+
+        except IndexError:
+            if not 0 <= index < self.count:
+                raise
+
+        data = self.module.data
+
+        with self.module.lock:
+            while len(self.items) <= index:
+                item, self.offset = self.decode(data, self.offset)
+
+                self.items.append(item)
+
+        return self.items[index]
+
+    def decode(self, data, offset):
+        raise NotImplementedError('"decode" needs to be implemented in subclasses')
+
+
+class LazyConstants(LazySequence):
+
+    def decode(self, data, offset):
+        return decode(data, offset)
+
+
+class LazyStrings(LazySequence):
+
+    def decode(self, data, offset):
+        return decode_string(data, offset)
+
+
+class LazyConstantsV2(LazySequence):
+
+    def __init__(self, module, strings, offset, count):
+        LazySequence.__init__(self, module, offset, count)
+
+        self.strings = strings
+
+    def decode(self, data, offset):
+        return decode_constant(data, offset, self.strings)
+
+
 class NativeModule(Module):
 
     def __init__(self, name, scope=None):
         Module.__init__(self, name, None, None, None, scope or mania.frame.Scope())
 
+        self.scope.module = self
+
         for name in dir(self):
             value = getattr(self, name)
 
@@ -822,7 +2179,11 @@ class NativeModule(Module):
                 if getattr(value, '_export', False):
                     name = getattr(value, '_export_name', name)
 
-                    self.register(name, NativeFunction(value, Symbol(name)))
+                    self.register(name, NativeFunction(
+                        value,
+                        Symbol(name),
+                        getattr(value, '_pass_vm', False)
+                    ))
 
     def to_string(self):
         return String('(native-module {0})'.format(self.name))
@@ -848,6 +2209,12 @@ def export(function):
     return function
 
 
+def pass_vm(function):
+    function._pass_vm = True
+
+    return function
+
+
 class Stream(Type):
 
     def __init__(self, stream):
@@ -855,3 +2222,6 @@ class Stream(Type):
 
     def to_string(self):
         return String('(stream)')
+
+
+expansion_cache = mania.utils.ExpressionCache(DEFAULT_EXPANSION_CACHE_SIZE)
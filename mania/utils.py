@@ -11,6 +11,8 @@
 from __future__ import absolute_import
 import logging
 import re
+import collections
+import threading
 import mania.types
 
 
@@ -48,6 +50,13 @@ r_name = re.compile((
 
 
 def split_name(name):
+    if name.parts is None:
+        name.parts = list(iter_split_name(name))
+
+    return name.parts
+
+
+def iter_split_name(name):
     name = name.value
     parts = []
 
@@ -77,3 +86,45 @@ def split_name(name):
             mania.types.Symbol,
             [':'.join(parts[:len(parts) - i])] + parts[len(parts) - i:]
         )
+
+
+class ExpressionCache(object):
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, expression, key):
+        key = (id(expression), key)
+
+        with self.lock:
+            entry = self.entries.pop(key, None)
+
+            if entry is not None and entry[0] is expression:
+                self.entries[key] = entry
+                self.hits += 1
+
+                return entry[1]
+
+            self.misses += 1
+
+    def put(self, expression, key, value):
+        with self.lock:
+            self.entries[(id(expression), key)] = (expression, value)
+
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0